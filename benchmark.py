@@ -0,0 +1,130 @@
+# Замеры производительности компонентов парсера
+# Использование: python benchmark.py emails [файл.html ...]
+#                python benchmark.py parsers [файл.html ...]
+import argparse
+import logging
+import random
+import re
+import string
+import time
+
+import html_backend
+import parser as site_parser
+
+def legacy_find_emails(html):
+    """Прежняя версия find_emails (четыре некомпилированных выражения) - для сравнения"""
+    email_patterns = [
+        r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}",
+        r"[a-zA-Z0-9._%+-]+\s@\s[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}",
+        r"[a-zA-Z0-9._%+-]+\s\(at\)\s[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}",
+        r"[a-zA-Z0-9._%+-]+\s*\(at\)\s*[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}"
+    ]
+    emails = set()
+    for pattern in email_patterns:
+        for match in re.findall(pattern, html):
+            emails.add(match.replace(" ", "").replace("(at)", "@"))
+    return list(emails)
+
+def synthetic_html(size_mb=2.0, seed=0):
+    """Страница, похожая на реальную: текст с адресами, base64-картинки и минифицированный JS"""
+    rng = random.Random(seed)
+    alphabet = string.ascii_letters + string.digits
+    parts = []
+    size = 0
+    while size < size_mb * 1024 * 1024:
+        kind = rng.random()
+        if kind < 0.4:
+            part = "<p>" + " ".join(rng.choice(["lorem", "ipsum", "dolor", "contact", "team"]) for _ in range(80))
+            part += f" write to user{rng.randint(1, 999)}@example{rng.randint(1, 9)}.com</p>\n"
+        elif kind < 0.7:
+            # Длинные буквенно-цифровые строки - худший случай для бэктрекинга
+            part = '<img src="data:image/png;base64,' + "".join(rng.choice(alphabet) for _ in range(20000)) + '">\n'
+        elif kind < 0.9:
+            part = "<script>var a='" + "".join(rng.choice(alphabet + "._-") for _ in range(10000)) + "';</script>\n"
+        else:
+            part = f"<p>jobs [at] company{rng.randint(1, 9)} [dot] de, hr&#64;company.de</p>\n"
+        parts.append(part)
+        size += len(part)
+    return "".join(parts)
+
+def measure(function, html, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(html)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def benchmark_emails(paths, repeat, legacy=False):
+    pages = [(path, open(path, encoding="utf-8", errors="replace").read()) for path in paths]
+    if not pages:
+        pages = [("synthetic (2 MB)", synthetic_html())]
+    for name, html in pages:
+        size_mb = len(html.encode("utf-8")) / (1024 * 1024)
+        print(f"📄 {name}: {size_mb:.2f} MB")
+        functions = [("current", site_parser.find_emails)]
+        if legacy:
+            # Прежняя версия квадратична на длинных строках: даже на 50 КБ синтетики это около минуты
+            functions.insert(0, ("legacy", legacy_find_emails))
+        for label, function in functions:
+            elapsed, emails = measure(function, html, repeat)
+            print(f"   {label:8} {elapsed * 1000:9.1f} ms  {size_mb / elapsed:8.1f} MB/s  {len(emails)} email")
+
+def synthetic_page(links=300, paragraphs=200, seed=0):
+    """Обычная страница сайта компании: меню из ссылок, абзацы текста, скрипты и стили"""
+    rng = random.Random(seed)
+    words = ["lorem", "ipsum", "dolor", "company", "team", "careers", "software", "developer", "contact"]
+    parts = ['<!doctype html><html lang="en"><head><meta charset="utf-8">',
+             '<meta name="description" content="Company site"><meta property="og:locale" content="en_US">',
+             "<style>" + "body{margin:0}" * 500 + "</style></head><body><nav>"]
+    for i in range(links):
+        parts.append(f'<a href="/page-{i}" class="nav-link"><span>{rng.choice(words)}</span> {i}</a>')
+    parts.append("</nav><main>")
+    for _ in range(paragraphs):
+        parts.append("<div class=\"block\"><p>" + " ".join(rng.choice(words) for _ in range(60)) + " <b>bold</b></p></div>")
+        if rng.random() < 0.1:
+            parts.append("<script>var data = " + repr([rng.random() for _ in range(100)]) + ";</script>")
+    parts.append("</main></body></html>")
+    return "".join(parts)
+
+def benchmark_parsers(paths, repeat, backends=None, max_paragraphs=0):
+    pages = [(path, open(path, encoding="utf-8", errors="replace").read()) for path in paths]
+    if not pages:
+        pages = [("synthetic page", synthetic_page()), ("synthetic (2 MB)", synthetic_html())]
+    backends = backends or html_backend.available_backends()
+    for name, html in pages:
+        size_mb = len(html.encode("utf-8")) / (1024 * 1024)
+        print(f"📄 {name}: {size_mb:.2f} MB")
+        for backend in backends:
+            best = float("inf")
+            peak = 0
+            for _ in range(repeat):
+                document, elapsed, memory = html_backend.profile_parse(html, backend, max_paragraphs)
+                best = min(best, elapsed)
+                peak = max(peak, memory)
+            print(f"   {backend:10} {best * 1000:9.1f} ms  {size_mb / best:8.1f} MB/s  пик {peak / (1024 * 1024):7.2f} MB  "
+                  f"{len(document.links)} ссылок, {len(document.paragraphs)} абзацев")
+
+def main():
+    parser = argparse.ArgumentParser(description="Замеры производительности парсера")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    emails_parser = subparsers.add_parser("emails", help="скорость поиска email")
+    emails_parser.add_argument("paths", nargs="*", help="сохраненные HTML-страницы (по умолчанию - синтетическая)")
+    emails_parser.add_argument("--repeat", type=int, default=3)
+    emails_parser.add_argument("--legacy", action="store_true", help="сравнить с прежней версией find_emails")
+    parsers_parser = subparsers.add_parser("parsers", help="время разбора и пик памяти для каждого HTML-парсера")
+    parsers_parser.add_argument("paths", nargs="*", help="сохраненные HTML-страницы (по умолчанию - синтетические)")
+    parsers_parser.add_argument("--repeat", type=int, default=3)
+    parsers_parser.add_argument("--backend", action="append", choices=list(html_backend.BACKENDS),
+                                help="какие парсеры сравнивать (по умолчанию - все установленные)")
+    parsers_parser.add_argument("--max-paragraphs", type=int, default=0, help="сколько абзацев собирать (0 - все)")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    if args.command == "emails":
+        benchmark_emails(args.paths, args.repeat, args.legacy)
+    elif args.command == "parsers":
+        benchmark_parsers(args.paths, args.repeat, args.backend, args.max_paragraphs)
+
+if __name__ == "__main__":
+    main()
@@ -1,63 +1,46 @@
-import gspread
-from google.oauth2.service_account import Credentials
 import logging
 import requests
-from bs4 import BeautifulSoup
 import time
 from urllib.parse import urlparse, urljoin
-from langdetect import detect, DetectorFactory
-
-# Уніфікованість результатів визначення мови
-DetectorFactory.seed = 0
+from site_language import get_language_detector
+from html_backend import parse_html
+from sheet_sync import SheetWriteBuffer
+from storage import get_storage
 
 # Настройка логування
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
-_client = None
-
-def authenticate_google_sheets():
-    """Авторизація в Google Sheets"""
-    global _client
-    if _client is not None:
-        return _client
+_session = None
 
-    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-    try:
-        creds = Credentials.from_service_account_file("credentials.json", scopes=scope)
-        _client = gspread.authorize(creds)
-        logging.info("✅ Успішна авторизація в Google Sheets.")
-        return _client
-    except Exception as e:
-        logging.error(f"❌ Помилка авторизації: {e}")
-        raise
+REQUEST_HEADERS = {"User-Agent": "Mozilla/5.0"}
+REQUEST_TIMEOUT = 10
 
 def get_sheet_data(spreadsheet_name):
-    """Отримує дані з листа 'SiteInfo' (Website, Site Language, Тип сайту)"""
+    """
+    Отримує дані з листа 'SiteInfo' (Website, Site Language, Тип сайту) одним запитом.
+    Повертає також весь вміст листа - щоб не перезаписувати незмінені значення.
+    """
     try:
-        client = authenticate_google_sheets()
-        sheet = client.open(spreadsheet_name).worksheet("SiteInfo")
-        data = sheet.get_all_records()
+        sheet = get_storage().open_worksheet(spreadsheet_name, "SiteInfo")
+        values = sheet.get_all_values()
+        headers = values[0] if values else []
 
         websites = []
-        site_language_col = None
-        site_type_col = None
+        site_language_col = headers.index("Site Language") + 1 if "Site Language" in headers else None
+        site_type_col = headers.index("Тип сайту") + 1 if "Тип сайту" in headers else None
 
-        for i, row in enumerate(data):
-            if "Website" in row and row["Website"].strip():
-                formatted_url = format_url(row["Website"])
-                websites.append((i + 2, formatted_url))  # +2 через заголовки
-
-            if site_language_col is None and "Site Language" in row:
-                site_language_col = list(row.keys()).index("Site Language") + 1
-
-            if site_type_col is None and "Тип сайту" in row:
-                site_type_col = list(row.keys()).index("Тип сайту") + 1
+        if "Website" in headers:
+            website_index = headers.index("Website")
+            for i, row in enumerate(values[1:]):
+                if website_index < len(row) and row[website_index].strip():
+                    formatted_url = format_url(row[website_index])
+                    websites.append((i + 2, formatted_url))  # +2 через заголовки
 
         logging.info(f"📥 Знайдено {len(websites)} сайтів для обробки.")
-        return sheet, websites, site_language_col, site_type_col
+        return sheet, websites, site_language_col, site_type_col, values
     except Exception as e:
         logging.error(f"❌ Помилка отримання даних з Google Sheets: {e}")
-        return None, [], None, None
+        return None, [], None, None, []
 
 def format_url(url):
     """Форматує URL у вигляді https://domain.com"""
@@ -66,64 +49,88 @@ def format_url(url):
         return f"{parsed.scheme}://{parsed.netloc}"
     return f"https://{parsed.path.split('/')[0]}"
 
-def detect_language(text):
-    """Визначає мову тексту"""
+def get_session():
+    """Спільна сесія для всіх сайтів (з'єднання перевикористовуються)"""
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        _session.headers.update(REQUEST_HEADERS)
+    return _session
+
+def extract_language(url, html, headers, document):
+    """Мова сайту (lang, Content-Language, og:locale, інакше за видимим текстом)"""
+    return get_language_detector().detect(url, html, headers, default="unknown")
+
+def extract_site_type(url, html, headers, document):
+    """Тип сайту: 'візитка' або 'багато сторінок'"""
+    domain = urlparse(url).netloc
+    internal_links = set()
+
+    for href, _ in document.links:
+        full_url = urljoin(url, href)
+        if domain in urlparse(full_url).netloc and full_url != url:
+            internal_links.add(full_url)
+
+    return "багато сторінок" if len(internal_links) > 5 else "візитка"
+
+def extract_about(url, html, headers, document):
+    """Перший абзац з інформацією про компанію"""
+    for text in document.paragraphs:
+        if 50 < len(text) < 500:  # Відсіюємо короткі та довгі тексти
+            return text
+    return "Не знайдено"
+
+# Поле профілю -> (екстрактор, значення при помилці, значення, якщо сайт відповів не 200)
+PROFILE_EXTRACTORS = {
+    "language": (extract_language, "unknown", "unknown"),
+    "type": (extract_site_type, "unknown", "unknown"),
+    "about": (extract_about, "❌ Помилка парсингу", "❌ Сайт недоступний"),
+}
+
+def profile_site(url, session=None, fields=None):
+    """
+    Профіль сайту (мова, тип, опис) за одне завантаження і один розбір головної сторінки.
+    Якщо один екстрактор падає, решта полів все одно повертаються.
+    """
+    fields = fields or list(PROFILE_EXTRACTORS)
     try:
-        return detect(text)
-    except Exception:
-        return "unknown"
+        response = (session or get_session()).get(url, timeout=REQUEST_TIMEOUT)
+    except Exception as e:
+        logging.error(f"❌ Помилка завантаження {url}: {e}")
+        return {field: PROFILE_EXTRACTORS[field][1] for field in fields}
+    if response.status_code != 200:
+        return {field: PROFILE_EXTRACTORS[field][2] for field in fields}
 
-def get_site_language(url):
-    """Визначає мову сайту (meta description або <p>)"""
+    html = response.text  # requests декодує тіло при кожному зверненні - декодуємо один раз
     try:
-        headers = {"User-Agent": "Mozilla/5.0"}
-        response = requests.get(url, headers=headers, timeout=10)
-        if response.status_code != 200:
-            return "unknown"
-
-        soup = BeautifulSoup(response.text, "html.parser")
-
-        # Пробуємо взяти мову з метатегу description
-        meta_desc = soup.find("meta", attrs={"name": "description"})
-        text = meta_desc["content"] if meta_desc else ""
-
-        # Якщо мета-тег не дав результату, беремо перший <p>
-        if not text:
-            paragraph = soup.find("p")
-            text = paragraph.get_text(strip=True) if paragraph else ""
-
-        return detect_language(text) if text else "unknown"
+        document = parse_html(html)
     except Exception as e:
-        logging.error(f"❌ Помилка визначення мови {url}: {e}")
-        return "unknown"
+        logging.error(f"❌ Помилка розбору {url}: {e}")
+        document = None  # Екстрактори, яким потрібен документ, повернуть значення помилки
+
+    profile = {}
+    for field in fields:
+        extractor, error_value, _ = PROFILE_EXTRACTORS[field]
+        try:
+            profile[field] = extractor(url, html, response.headers, document)
+        except Exception as e:
+            logging.error(f"❌ Помилка визначення '{field}' для {url}: {e}")
+            profile[field] = error_value
+    return profile
+
+def get_site_language(url):
+    """Визначає мову сайту"""
+    return profile_site(url, fields=["language"])["language"]
 
 def get_site_type(url):
     """Визначає тип сайту: 'візитка' або 'багато сторінок'"""
-    try:
-        headers = {"User-Agent": "Mozilla/5.0"}
-        response = requests.get(url, headers=headers, timeout=10)
-        if response.status_code != 200:
-            return "unknown"
-
-        soup = BeautifulSoup(response.text, "html.parser")
-        domain = urlparse(url).netloc
-        internal_links = set()
-
-        for link in soup.find_all("a", href=True):
-            href = link["href"]
-            full_url = urljoin(url, href)
-            if domain in urlparse(full_url).netloc and full_url != url:
-                internal_links.add(full_url)
-
-        return "багато сторінок" if len(internal_links) > 5 else "візитка"
-    except Exception as e:
-        logging.error(f"❌ Помилка визначення типу сайту {url}: {e}")
-        return "unknown"
+    return profile_site(url, fields=["type"])["type"]
 
-def get_next_empty_column(sheet):
+def get_next_empty_column(sheet, headers=None):
     """Знаходить наступну вільну колонку після 'Website'"""
     try:
-        headers = sheet.row_values(1)
+        if headers is None:
+            headers = sheet.row_values(1)
         if "Website" in headers:
             website_index = headers.index("Website")
             return website_index + 2  # Наступна колонка після Website
@@ -134,60 +141,42 @@ def get_next_empty_column(sheet):
 
 def scrape_about_page(url):
     """Парсить сайт і шукає інформацію про компанію"""
-    try:
-        headers = {"User-Agent": "Mozilla/5.0"}
-        response = requests.get(url, headers=headers, timeout=10)
-        if response.status_code != 200:
-            return "❌ Сайт недоступний"
-
-        soup = BeautifulSoup(response.text, "html.parser")
-        paragraphs = soup.find_all("p")
-        about_text = ""
-
-        for p in paragraphs:
-            text = p.get_text(strip=True)
-            if 50 < len(text) < 500:  # Відсіюємо короткі та довгі тексти
-                about_text = text
-                break
-
-        return about_text if about_text else "Не знайдено"
-    except Exception as e:
-        logging.error(f"❌ Помилка парсингу {url}: {e}")
-        return "❌ Помилка парсингу"
-
-def update_sheet(sheet, row, col, value):
-    """Оновлює конкретну ячейку в Google Sheets"""
-    try:
-        sheet.update_cell(row, col, value)
-        logging.info(f"✅ Записано в {row}:{col}")
-    except Exception as e:
-        logging.error(f"❌ Помилка запису в Google Sheets: {e}")
+    return profile_site(url, fields=["about"])["about"]
 
 def main(spreadsheet_name):
-    sheet, websites, site_language_col, site_type_col = get_sheet_data(spreadsheet_name)
+    sheet, websites, site_language_col, site_type_col, values = get_sheet_data(spreadsheet_name)
     if not sheet or not websites or not site_language_col or not site_type_col:
         logging.error("❌ Помилка отримання даних.")
         return
 
-    next_column = get_next_empty_column(sheet)
+    next_column = get_next_empty_column(sheet, values[0])
     if not next_column:
         logging.error("❌ Не вдалося знайти наступну колонку для даних.")
         return
 
-    for row, website in websites:
-        update_sheet(sheet, row, 2, website)
-
-        site_language = get_site_language(website)
-        update_sheet(sheet, row, site_language_col, site_language)
-
-        site_type = get_site_type(website)
-        update_sheet(sheet, row, site_type_col, site_type)
-
-        about_info = scrape_about_page(website)
-        update_sheet(sheet, row, next_column, about_info)
-
-        time.sleep(2)  # Антибан
+    session = get_session()
+    # Записи накопичуються і йдуть пакетами; значення, що вже є в таблиці, не перезаписуються
+    buffer = SheetWriteBuffer(sheet, current=values)
 
+    try:
+        for row, website in websites:
+            buffer.update_cell(row, 2, website)
+
+            # Одне завантаження головної сторінки на всі три поля
+            profile = profile_site(website, session)
+            buffer.update_cell(row, site_language_col, profile["language"])
+            buffer.update_cell(row, site_type_col, profile["type"])
+            buffer.update_cell(row, next_column, profile["about"])
+
+            time.sleep(2)  # Антибан
+    finally:
+        buffer.close()
+
+    logging.info(f"📤 Записано клітинок: {buffer.stats['cells']} за {buffer.stats['requests']} запитів, "
+                 f"без змін пропущено: {buffer.stats['skipped']}")
+    storage_summary = get_storage().summary()
+    if storage_summary:
+        logging.info(storage_summary)
     logging.info("✅ Парсинг завершено.")
 
 # Запуск коду
@@ -1,13 +1,7 @@
-import json
 import sys
 from datetime import datetime
-from typing import Dict, List
 import difflib
-
-def load_results(file_path: str) -> List[Dict]:
-    """Загрузка результатов из JSON файла"""
-    with open(file_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+from results_io import load_results
 
 def compare_results(old_file: str, new_file: str):
     """Сравнение результатов двух проверок"""
@@ -0,0 +1,152 @@
+import asyncio
+import ipaddress
+import socket
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from aiohttp.abc import AbstractResolver
+
+try:
+    import aiodns
+except ImportError:  # aiodns необязателен: без него TTL берется по умолчанию
+    aiodns = None
+
+DEFAULT_DNS_TTL = 300  # TTL (сек), если резолвер не сообщает свой
+NEGATIVE_DNS_TTL = 600  # Сколько помним, что домен не существует
+DNS_CONCURRENCY = 100  # Сколько имен резолвим одновременно при предварительном резолве
+
+# Коды getaddrinfo, которые означают, что имени нет (а не временный сбой DNS)
+NOT_FOUND_ERRNOS = {socket.EAI_NONAME, getattr(socket, 'EAI_NODATA', socket.EAI_NONAME)}
+
+
+class HostNotFoundError(OSError):
+    """Домен не существует (NXDOMAIN)"""
+
+
+class CachingResolver(AbstractResolver):
+    """Резолвер для aiohttp с кэшем по TTL и кэшем несуществующих доменов"""
+
+    def __init__(self, default_ttl: float = DEFAULT_DNS_TTL, negative_ttl: float = NEGATIVE_DNS_TTL,
+                 concurrency: int = DNS_CONCURRENCY):
+        self.default_ttl = default_ttl
+        self.negative_ttl = negative_ttl
+        self.concurrency = concurrency
+        # host -> (истекает, [(family, ip)] или None для несуществующего домена)
+        self._cache: Dict[str, Tuple[float, Optional[List[Tuple[int, str]]]]] = {}
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._dns = aiodns.DNSResolver() if aiodns else None
+        self.stats = {'lookups': 0, 'hits': 0, 'not_found': 0}
+
+    def _cached(self, host: str):
+        entry = self._cache.get(host)
+        if entry and entry[0] > time.monotonic():
+            return entry
+        return None
+
+    def is_not_found(self, host: str) -> bool:
+        """Домен уже известен как несуществующий"""
+        entry = self._cached(host)
+        return entry is not None and entry[1] is None
+
+    async def _lookup_aiodns(self, host: str) -> Tuple[float, List[Tuple[int, str]]]:
+        """getaddrinfo через c-ares: адреса вместе с их TTL"""
+        result = await self._dns.getaddrinfo(host, type=socket.SOCK_STREAM)
+        addresses = []
+        for node in result.nodes:
+            address = node.addr[0]
+            addresses.append((node.family, address.decode() if isinstance(address, bytes) else address))
+        # Записи из hosts-файла приходят с нулевым TTL
+        ttls = [node.ttl for node in result.nodes if node.ttl > 0]
+        return min(ttls, default=self.default_ttl), list(dict.fromkeys(addresses))
+
+    async def _lookup_system(self, host: str) -> Tuple[float, List[Tuple[int, str]]]:
+        """Системный getaddrinfo (TTL неизвестен)"""
+        loop = asyncio.get_running_loop()
+        infos = await loop.getaddrinfo(host, None, type=socket.SOCK_STREAM)
+        addresses = list(dict.fromkeys((family, sockaddr[0]) for family, _, _, _, sockaddr in infos))
+        return self.default_ttl, addresses
+
+    async def _lookup(self, host: str):
+        try:
+            # IP-адрес резолвить не нужно
+            address = ipaddress.ip_address(host)
+            family = socket.AF_INET6 if address.version == 6 else socket.AF_INET
+            self._cache[host] = (float('inf'), [(family, host)])
+            return
+        except ValueError:
+            pass
+
+        self.stats['lookups'] += 1
+        try:
+            if self._dns is not None:
+                try:
+                    ttl, addresses = await self._lookup_aiodns(host)
+                except aiodns.error.DNSError as e:
+                    if e.args and e.args[0] == aiodns.error.ARES_ENOTFOUND:
+                        raise HostNotFoundError(socket.EAI_NONAME, f'{host}: domain name not found')
+                    # Временный сбой - пробуем системный резолвер
+                    ttl, addresses = await self._lookup_system(host)
+            else:
+                ttl, addresses = await self._lookup_system(host)
+        except socket.gaierror as e:
+            if e.errno not in NOT_FOUND_ERRNOS:
+                raise
+            self._remember_not_found(host)
+            raise HostNotFoundError(e.errno, f'{host}: {e.strerror}')
+        except HostNotFoundError:
+            self._remember_not_found(host)
+            raise
+        self._cache[host] = (time.monotonic() + ttl, addresses)
+
+    def _remember_not_found(self, host: str):
+        self.stats['not_found'] += 1
+        self._cache[host] = (time.monotonic() + self.negative_ttl, None)
+
+    async def _ensure(self, host: str):
+        """Резолвит имя один раз, даже если его одновременно запросили несколько задач"""
+        if self._cached(host):
+            self.stats['hits'] += 1
+            return
+        future = self._pending.get(host)
+        if future is None:
+            future = self._pending[host] = asyncio.ensure_future(self._lookup(host))
+            future.add_done_callback(lambda _: self._pending.pop(host, None))
+        await asyncio.shield(future)
+
+    async def prefetch(self, hosts: Iterable[str]):
+        """Предварительный параллельный резолв всех имен"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def resolve_one(host: str):
+            async with semaphore:
+                try:
+                    await self._ensure(host)
+                except OSError:
+                    pass
+
+        await asyncio.gather(*(resolve_one(host) for host in set(hosts) if host))
+
+    async def resolve(self, host: str, port: int = 0, family: int = socket.AF_INET) -> List[Dict]:
+        """Интерфейс aiohttp: адреса из кэша (при промахе - резолв)"""
+        entry = self._cached(host)
+        if entry is None:
+            await self._ensure(host)
+            entry = self._cached(host)
+        if entry[1] is None:
+            raise HostNotFoundError(socket.EAI_NONAME, f'{host}: domain name not found (cached)')
+        return [
+            {
+                'hostname': host,
+                'host': address,
+                'port': port,
+                'family': address_family,
+                'proto': 0,
+                'flags': socket.AI_NUMERICHOST | socket.AI_NUMERICSERV
+            }
+            for address_family, address in entry[1]
+            if family in (socket.AF_UNSPEC, address_family)
+        ]
+
+    async def close(self):
+        if self._dns is not None:
+            self._dns.cancel()
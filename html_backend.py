@@ -0,0 +1,207 @@
+import logging
+import re
+import time
+import tracemalloc
+from html.parser import HTMLParser
+
+from bs4 import BeautifulSoup
+
+# Быстрые парсеры необязательны: без них работает потоковый разбор на стандартной библиотеке
+try:
+    from selectolax.lexbor import LexborHTMLParser as SelectolaxParser
+except ImportError:
+    SelectolaxParser = None
+
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+
+BACKEND_ORDER = ["selectolax", "lxml", "stream"]  # Порядок выбора по умолчанию (от быстрого к медленному)
+FALLBACK_BACKEND = "bs4"  # Если выбранный парсер не справился со страницей
+HIDDEN_TAGS = ("script", "style", "noscript", "template")  # Текст этих тегов не считается текстом страницы
+# lxml не принимает str с объявлением кодировки (<?xml ... encoding="..."?>) - у XHTML-страниц его убираем
+XML_DECLARATION_RE = re.compile(r"^\ufeff?\s*<\?xml[^>]*\?>")
+TEXT_SEPARATOR = " "  # Между текстами соседних тегов (одинаково во всех парсерах: Data<br>Engineer -> Data Engineer)
+
+class Document:
+    """Результат разбора страницы - только то, что нужно обработчикам"""
+
+    def __init__(self, backend, lang="", links=None, meta=None, paragraphs=None, text=""):
+        self.backend = backend
+        self.lang = lang or ""  # Атрибут lang тега <html>
+        self.links = links or []  # [(href, текст ссылки)]
+        self.meta = meta or []  # [{атрибут: значение}] для каждого <meta>
+        self.paragraphs = paragraphs or []  # Тексты <p> в порядке появления
+        self.text = text  # Весь текст документа, включая <head> (<title>), без скриптов и стилей, пробелы схлопнуты
+
+def _clean(text):
+    return " ".join(text.split())
+
+def _parse_selectolax(html, max_paragraphs):
+    tree = SelectolaxParser(html)
+    tree.strip_tags(list(HIDDEN_TAGS))
+    root = tree.css_first("html")
+    paragraphs = tree.css("p")[:max_paragraphs] if max_paragraphs else tree.css("p")
+    return Document(
+        "selectolax",
+        lang=root.attributes.get("lang") if root is not None else "",
+        links=[(node.attributes.get("href") or "", _clean(node.text())) for node in tree.css("a[href]")],
+        meta=[dict(node.attributes) for node in tree.css("meta")],
+        paragraphs=[_clean(node.text()) for node in paragraphs],
+        text=_clean(tree.root.text(separator=TEXT_SEPARATOR)) if tree.root is not None else ""
+    )
+
+def _parse_lxml(html, max_paragraphs):
+    root = lxml.html.document_fromstring(XML_DECLARATION_RE.sub("", html, count=1))
+    for element in list(root.iter(*HIDDEN_TAGS)):
+        element.drop_tree()
+    paragraphs = []
+    for element in root.iter("p"):
+        if max_paragraphs and len(paragraphs) >= max_paragraphs:
+            break
+        paragraphs.append(_clean(element.text_content()))
+    return Document(
+        "lxml",
+        lang=root.get("lang", ""),
+        links=[(element.get("href"), _clean(element.text_content())) for element in root.iter("a")
+               if element.get("href") is not None],
+        meta=[dict(element.attrib) for element in root.iter("meta")],
+        paragraphs=paragraphs,
+        text=_clean(TEXT_SEPARATOR.join(root.itertext()))
+    )
+
+class _StreamParser(HTMLParser):
+    """Потоковый разбор без построения дерева: собирает ссылки, meta, абзацы и текст"""
+
+    def __init__(self, max_paragraphs):
+        super().__init__(convert_charrefs=True)
+        self.max_paragraphs = max_paragraphs
+        self.document = Document("stream")
+        self._hidden = 0
+        self._text = []
+        self._link = None  # [href, [части текста]] открытой ссылки
+        self._paragraph = None  # части текста открытого абзаца
+
+    def handle_starttag(self, tag, attrs):
+        if tag in HIDDEN_TAGS:
+            self._hidden += 1
+        elif tag == "a":
+            self._close_link()
+            href = dict(attrs).get("href")
+            if href is not None:
+                self._link = [href, []]
+        elif tag == "meta":
+            self.document.meta.append({name: value or "" for name, value in attrs})
+        elif tag == "html" and not self.document.lang:
+            self.document.lang = dict(attrs).get("lang") or ""
+        elif tag == "p":
+            self._close_paragraph()
+            if not self.max_paragraphs or len(self.document.paragraphs) < self.max_paragraphs:
+                self._paragraph = []
+        self._text.append(TEXT_SEPARATOR)
+
+    def handle_endtag(self, tag):
+        if tag in HIDDEN_TAGS:
+            self._hidden = max(self._hidden - 1, 0)
+        elif tag == "a":
+            self._close_link()
+        elif tag == "p":
+            self._close_paragraph()
+        self._text.append(TEXT_SEPARATOR)
+
+    def handle_data(self, data):
+        if self._hidden:
+            return
+        self._text.append(data)
+        if self._link is not None:
+            self._link[1].append(data)
+        if self._paragraph is not None:
+            self._paragraph.append(data)
+
+    def _close_link(self):
+        if self._link is not None:
+            self.document.links.append((self._link[0], _clean("".join(self._link[1]))))
+            self._link = None
+
+    def _close_paragraph(self):
+        if self._paragraph is not None:
+            self.document.paragraphs.append(_clean("".join(self._paragraph)))
+            self._paragraph = None
+
+    def result(self):
+        self.close()
+        self._close_link()
+        self._close_paragraph()
+        self.document.text = _clean("".join(self._text))
+        return self.document
+
+def _parse_stream(html, max_paragraphs):
+    parser = _StreamParser(max_paragraphs)
+    parser.feed(html)
+    return parser.result()
+
+def _parse_bs4(html, max_paragraphs):
+    soup = BeautifulSoup(html, "html.parser")
+    for element in soup(list(HIDDEN_TAGS)):
+        element.decompose()
+    root = soup.find("html")
+    return Document(
+        "bs4",
+        lang=root.get("lang", "") if root is not None else "",
+        links=[(link["href"], _clean(link.get_text())) for link in soup.find_all("a", href=True)],
+        meta=[dict(meta.attrs) for meta in soup.find_all("meta")],
+        paragraphs=[_clean(p.get_text()) for p in soup.find_all("p", limit=max_paragraphs or None)],
+        text=_clean(soup.get_text(TEXT_SEPARATOR))
+    )
+
+BACKENDS = {
+    "selectolax": _parse_selectolax if SelectolaxParser is not None else None,
+    "lxml": _parse_lxml if lxml is not None else None,
+    "stream": _parse_stream,
+    "bs4": _parse_bs4
+}
+
+def available_backends():
+    return [name for name, parse in BACKENDS.items() if parse is not None]
+
+def default_backend():
+    """Самый быстрый из установленных парсеров"""
+    return next(name for name in BACKEND_ORDER if BACKENDS[name] is not None)
+
+def parse_html(html, backend=None, max_paragraphs=0):
+    """
+    Разбирает HTML выбранным (по умолчанию самым быстрым) парсером.
+    max_paragraphs ограничивает число абзацев (0 - все); при ошибке разбора используется BeautifulSoup.
+    """
+    backend = backend or default_backend()
+    parse = BACKENDS.get(backend)
+    if parse is None:
+        raise ValueError(f"Парсер {backend} не установлен, доступны: {', '.join(available_backends())}")
+    try:
+        return parse(html, max_paragraphs)
+    except Exception as e:
+        if backend == FALLBACK_BACKEND:
+            raise
+        logging.warning(f"⚠️ Парсер {backend} не справился со страницей ({e}), используем {FALLBACK_BACKEND}")
+        return BACKENDS[FALLBACK_BACKEND](html, max_paragraphs)
+
+def profile_parse(html, backend=None, max_paragraphs=0):
+    """
+    Разбор с замером: (документ, время в секундах, пик памяти в байтах).
+    tracemalloc видит только память Python: дерево lxml/selectolax в C-куче сюда не попадает.
+    """
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    try:
+        document = parse_html(html, backend, max_paragraphs)
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+    return document, elapsed, peak
@@ -2,22 +2,63 @@ import os
 import asyncio
 import aiohttp
 from bs4 import BeautifulSoup
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
-from typing import List, Dict
-import json
-from datetime import datetime
+from typing import List, Dict, Tuple, Optional
+from datetime import datetime, timedelta
 import re
-from urllib.parse import urlparse
+import codecs
+from urllib.parse import urlparse, urljoin, urldefrag
 from tqdm import tqdm
+from dns_cache import CachingResolver
+from results_io import JsonlResultWriter, jsonl_to_json, read_jsonl, load_results, site_key, find_latest_results
+from storage import STORAGE_KINDS, create_storage, get_storage, set_storage
 import sys
+import argparse
 import random
 
 # Конфигурация
-SCOPES = ['https://www.googleapis.com/auth/spreadsheets.readonly']
+SCOPES = ['https://www.googleapis.com/auth/spreadsheets.readonly']  # Проверке сайтов таблица нужна только для чтения
 SPREADSHEET_ID = '1984k6gru7k9WI8FYIUg9hA6HG80b4J5hacYFiIGbP5Y'  # Замените на ID вашей таблицы
 RANGE_NAME = 'Website_check!A2:A'  # Диапазон с URL сайтов
 
+# Параметры планировщика проверок
+MAX_CONCURRENCY = 20  # Сколько сайтов проверяется одновременно
+PER_HOST_LIMIT = 1  # Сколько одновременных запросов допускается к одному хосту
+HOST_DELAY_RANGE = (0.5, 1.5)  # Пауза (сек) между запросами к одному хосту
+NORMALIZE_TIMEOUT = 5  # Таймаут (сек) пробного запроса по https для URL без протокола
+
+# Параметры пула соединений
+POOL_LIMIT = 100  # Всего открытых соединений в пуле
+POOL_LIMIT_PER_HOST = 4  # Открытых соединений на один хост
+KEEPALIVE_TIMEOUT = 30  # Сколько секунд держать простаивающее соединение
+REDIRECT_DRAIN_BYTES = 64 * 1024  # Тело редиректа меньше этого дочитываем, чтобы вернуть соединение в пул
+
+# Параметры обхода редиректов
+MAX_REDIRECTS = 10  # Сколько переходов максимум проходим по цепочке редиректов
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+# Поля итоговой проверки, которые переиспользуются, если цепочка пришла на уже проверенный адрес
+VERDICT_FIELDS = ('final_url', 'status', 'response_time', 'error_type', 'is_domain_free', 'domain_free_signature')
+
+# Параметры продолжения прерванного запуска
+RESUME_MAX_AGE_HOURS = 24  # Результаты моложе этого не перепроверяем
+TRANSIENT_ERRORS = ('connection_error', 'timeout', 'unknown_error')  # Ошибки, которые можно перепроверить при --retry-errors
+
+# Параметры инкрементальной перепроверки по прошлым результатам
+# Как часто перепроверять сайт со стабильным итогом; не указанные типы - раз в DEFAULT_RECHECK_INTERVAL
+RECHECK_INTERVALS = {
+    'available': timedelta(days=7),
+    'domain_free': timedelta(days=3),
+    'not_found': timedelta(days=3),
+    'blocked_by_ip': timedelta(days=3)
+}
+DEFAULT_RECHECK_INTERVAL = timedelta(days=1)
+# Нестабильные итоги - такие сайты проверяются в каждом запуске
+VOLATILE_ERRORS = ('connection_error', 'timeout', 'unknown_error', 'server_error',
+                   'redirect_loop', 'too_many_redirects')
+
+# Параметры чтения тела страницы
+STREAM_CHUNK_SIZE = 64 * 1024  # Размер читаемого куска
+MAX_BODY_BYTES = 2 * 1024 * 1024  # Сколько байт страницы максимум просматриваем на признаки свободного домена
+
 # Заголовки для имитации браузера
 BROWSER_HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36',
@@ -33,126 +74,344 @@ BROWSER_HEADERS = {
     'Cache-Control': 'max-age=0'
 }
 
+# Фразы, которые встречаются после слова "domain" на страницах свободных/припаркованных доменов
+DOMAIN_FREE_PHRASES = [
+    'free',
+    'available',
+    'for sale',
+    'parked',
+    'not configured',
+    'not found',
+    'not connected',
+    'not active',
+    'not registered',
+    'not assigned',
+    'not pointing',
+    'not resolving',
+    'not set up',
+    'not working',
+    'not responding',
+    'not available',
+    'not valid'
+]
+DOMAIN_FREE_MAX_GAP = 200  # Максимум символов между "domain" и фразой (в пределах одной строки)
+
+class DomainFreeDetector:
+    """Однопроходный поиск признаков свободного домена по одному скомпилированному выражению"""
+
+    def __init__(self, phrases: List[str], max_gap: int = DOMAIN_FREE_MAX_GAP):
+        # Убираем дубликаты, длинные фразы ставим первыми
+        self.phrases = sorted(dict.fromkeys(p.lower() for p in phrases), key=len, reverse=True)
+        alternation = '|'.join(re.escape(p) for p in self.phrases)
+        # Опережающая проверка первого символа отсекает позиции, с которых не начинается ни одна фраза
+        first_chars = ''.join(re.escape(c) for c in sorted({p[0] for p in self.phrases}))
+        self.pattern = re.compile(rf'domain[^\n]{{0,{max_gap}}}?(?=[{first_chars}])({alternation})')
+
+        # Та же регулярка для сырых байтов: фразы ASCII, поэтому для ASCII-совместимых кодировок декодировать не нужно
+        self.bytes_pattern = re.compile(self.pattern.pattern.encode('ascii'))
+        # Длиннее этого совпадение быть не может - столько хвоста храним между кусками
+        self.max_match_length = len('domain') + max_gap + len(self.phrases[0])
+
+    def search(self, text: str) -> Optional[str]:
+        """Возвращает найденную сигнатуру ("domain ... фраза") или None"""
+        match = self.pattern.search(text.lower())
+        if match:
+            return f'domain {match.group(1)}'
+        return None
+
+    def scanner(self) -> 'DomainFreeScanner':
+        """Инкрементальный поиск по кускам тела ответа"""
+        return DomainFreeScanner(self)
+
+class DomainFreeScanner:
+    """Поиск сигнатуры по потоку кусков (str или bytes) с учетом совпадений на границе кусков"""
+
+    def __init__(self, detector: DomainFreeDetector):
+        self.detector = detector
+        self.tail = None
+
+    def feed(self, chunk) -> Optional[str]:
+        """Добавляет кусок и возвращает сигнатуру, если она найдена"""
+        if isinstance(chunk, bytes):
+            pattern = self.detector.bytes_pattern
+        else:
+            pattern = self.detector.pattern
+        chunk = chunk.lower()
+        buffer = self.tail + chunk if self.tail else chunk
+        match = pattern.search(buffer)
+        if match:
+            signature = match.group(1)
+            if isinstance(signature, bytes):
+                signature = signature.decode('ascii')
+            return f'domain {signature}'
+        self.tail = buffer[-(self.detector.max_match_length - 1):]
+        return None
+
 class SiteChecker:
-    def __init__(self):
-        self.creds = None
-        self.service = None
-        self.results = []
-        self.domain_free_patterns = [
-            r'domain.*free',
-            r'domain.*available',
-            r'domain.*for sale',
-            r'domain.*parked',
-            r'domain.*not configured',
-            r'domain.*not found',
-            r'domain.*not connected',
-            r'domain.*not active',
-            r'domain.*not registered',
-            r'domain.*not assigned',
-            r'domain.*not pointing',
-            r'domain.*not resolving',
-            r'domain.*not set up',
-            r'domain.*not working',
-            r'domain.*not responding',
-            r'domain.*not available',
-            r'domain.*not valid',
-            r'domain.*not active',
-            r'domain.*not configured',
-            r'domain.*not connected',
-            r'domain.*not found',
-            r'domain.*not registered',
-            r'domain.*not assigned',
-            r'domain.*not pointing',
-            r'domain.*not resolving',
-            r'domain.*not set up',
-            r'domain.*not working',
-            r'domain.*not responding',
-            r'domain.*not available',
-            r'domain.*not valid'
-        ]
+    def __init__(self, max_concurrency: int = MAX_CONCURRENCY,
+                 per_host_limit: int = PER_HOST_LIMIT,
+                 host_delay_range: Tuple[float, float] = HOST_DELAY_RANGE,
+                 pooled: bool = True,
+                 pool_limit: int = POOL_LIMIT,
+                 pool_limit_per_host: int = POOL_LIMIT_PER_HOST,
+                 keepalive_timeout: float = KEEPALIVE_TIMEOUT,
+                 stream_body: bool = True,
+                 max_body_bytes: int = MAX_BODY_BYTES,
+                 max_redirects: int = MAX_REDIRECTS,
+                 resume_path: Optional[str] = None,
+                 resume_max_age: timedelta = timedelta(hours=RESUME_MAX_AGE_HOURS),
+                 retry_errors: bool = False,
+                 previous_paths: Optional[List[str]] = None,
+                 dns_prefetch: bool = True):
+        self.sheet = None
+        self.sites_range = None
+        self.run_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.results_path = f'results_{self.run_id}.jsonl'
+        self.writer = None
+        self.resume_max_age = resume_max_age
+        self.retry_errors = retry_errors
+        self.checked_sites = {}  # site_key -> результат из продолжаемого запуска
+        self.checked_indexes = set()  # Строки таблицы, для которых в файле уже есть результат
+        self.previous_history = {}
+        self.dns_prefetch = dns_prefetch
+        self.resolver = None
+        if resume_path:
+            self._load_checkpoint(resume_path)
+        if previous_paths:
+            self._load_previous(previous_paths)
+        self.max_concurrency = max_concurrency
+        self.per_host_limit = per_host_limit
+        self.host_delay_range = host_delay_range
+        self._global_semaphore = None
+        self._host_semaphores = {}
+        self._host_next_time = {}
+        self.pooled = pooled
+        self.pool_limit = pool_limit
+        self.pool_limit_per_host = pool_limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.connection_stats = {'new': 0, 'reused': 0}
+        self.stream_body = stream_body
+        self.max_body_bytes = max_body_bytes
+        self.max_redirects = max_redirects
+        self._checked_urls = {}
+        self.domain_free_detector = DomainFreeDetector(DOMAIN_FREE_PHRASES)
+
+    def _load_checkpoint(self, path: str):
+        """Продолжение прерванного запуска: дописываем в тот же файл и пропускаем свежие результаты"""
+        self.results_path = path
+        self.run_id = os.path.basename(path)[len('results_'):-len('.jsonl')]
+        cutoff = datetime.now() - self.resume_max_age
+        for result in read_jsonl(path):
+            if self.retry_errors and result.get('error_type') in TRANSIENT_ERRORS:
+                continue
+            if datetime.fromisoformat(result['check_time']) >= cutoff:
+                self.checked_sites[site_key(result['url'])] = result
+                if 'index' in result:
+                    self.checked_indexes.add(result['index'])
+        print(f"⏯️ Продовження {path}: {len(self.checked_sites)} сайтів вже перевірено")
+
+    def _load_previous(self, paths: List[str]):
+        """История прошлых проверок по сайтам (от старых к новым)"""
+        for path in paths:
+            for result in load_results(path):
+                self.previous_history.setdefault(site_key(result['url']), []).append(result)
+        for history in self.previous_history.values():
+            history.sort(key=lambda result: result['check_time'])
+        print(f"📚 Завантажено історію перевірок для {len(self.previous_history)} сайтів")
+
+    def _verdict(self, result: Dict) -> str:
+        """Итог проверки с учетом редиректа (тип результата конечного URL)"""
+        final_check = result.get('final_url_check')
+        if result['error_type'] == 'redirect' and final_check:
+            return f"redirect:{final_check['error_type']}"
+        return result['error_type']
+
+    def _is_due(self, history: List[Dict]) -> bool:
+        """Пора ли перепроверять сайт с учетом давности и стабильности прошлых итогов"""
+        latest = history[-1]
+        verdict = self._verdict(latest)
+        final_status = latest['status']
+        if latest.get('final_url_check'):
+            final_status = latest['final_url_check']['status']
+        # Сайты с нестабильным итогом, 5xx или сменившимся итогом проверяем каждый раз
+        if verdict.split(':')[-1] in VOLATILE_ERRORS:
+            return True
+        if isinstance(final_status, int) and final_status >= 500:
+            return True
+        if len({self._verdict(result) for result in history}) > 1:
+            return True
+        interval = RECHECK_INTERVALS.get(verdict.split(':')[-1], DEFAULT_RECHECK_INTERVAL)
+        return datetime.now() - datetime.fromisoformat(latest['check_time']) >= interval
 
     async def setup_google_sheets(self):
-        """Настройка доступа к Google Sheets"""
+        """Открытие листа с сайтами (Google Sheets или локальная замена - см. storage.py)"""
         print("🔐 Авторизація в Google Sheets...")
-        self.creds = service_account.Credentials.from_service_account_file(
-            'credentials.json', scopes=SCOPES)
-        self.service = build('sheets', 'v4', credentials=self.creds)
+        worksheet, _, self.sites_range = RANGE_NAME.partition('!')
+        self.sheet = get_storage().open_worksheet(SPREADSHEET_ID, worksheet, by_key=True)
         print("✅ Авторизація успішна")
 
-    async def normalize_url(self, url: str) -> str:
-        """Нормализация URL - добавление протокола если отсутствует"""
+    async def normalize_url(self, session: aiohttp.ClientSession, url: str) -> Tuple[str, Optional[Dict]]:
+        """Нормализация URL - добавление протокола если отсутствует.
+
+        Возвращает URL и результат проверки по https, если сайт ответил по https
+        (тогда повторно проверять его не нужно), иначе None.
+        """
         if not url:
-            return url
+            return url, None
             
         # Проверяем, есть ли уже протокол
         parsed = urlparse(url)
         if not parsed.scheme:
-            # Пробуем сначала https
-            try:
-                async with aiohttp.ClientSession(headers=BROWSER_HEADERS) as session:
-                    async with session.get(f'https://{url}', timeout=5, ssl=False) as response:
-                        if response.status == 200:
-                            return f'https://{url}'
-            except:
-                pass
+            # Пробуем сначала https - это сразу полноценная проверка в общей сессии
+            probe = await self.check_site(session, f'https://{url}', timeout=NORMALIZE_TIMEOUT)
+            if self._answered_ok(probe):
+                return probe['url'], probe
             # Если https не работает, используем http
-            return f'http://{url}'
-        return url
+            return f'http://{url}', None
+        return url, None
+
+    def _answered_ok(self, result: Dict) -> bool:
+        """Сайт отдал 200 (сразу или после редиректа)"""
+        if result['status'] == 200:
+            return True
+        final_check = result.get('final_url_check')
+        return bool(final_check) and final_check['status'] == 200
 
     async def get_sites_from_sheet(self) -> List[str]:
-        """Получение списка сайтов из Google Sheets"""
+        """Получение списка сайтов из Google Sheets (нормализация выполняется при проверке)"""
         print("📊 Отримання даних з таблиці...")
-        result = self.service.spreadsheets().values().get(
-            spreadsheetId=SPREADSHEET_ID,
-            range=RANGE_NAME
-        ).execute()
-        urls = [row[0] for row in result.get('values', []) if row]
+        values = self.sheet.get_values(self.sites_range)
+        urls = [row[0] for row in values if row and row[0]]
         print(f"✅ Знайдено {len(urls)} сайтів")
-        normalized_urls = []
-        for url in urls:
-            normalized_url = await self.normalize_url(url)
-            normalized_urls.append(normalized_url)
-        return normalized_urls
+        return urls
 
     def check_domain_free(self, html: str) -> bool:
         """Проверка, является ли домен свободным или не настроенным"""
-        html_lower = html.lower()
-        for pattern in self.domain_free_patterns:
-            if re.search(pattern, html_lower):
-                return True
-        return False
-
-    async def check_final_url(self, session: aiohttp.ClientSession, url: str) -> Dict:
-        """Проверка конечного URL после редиректа"""
+        return self.domain_free_detector.search(html) is not None
+
+    async def _detect_domain_free(self, response: aiohttp.ClientResponse) -> Optional[str]:
+        """Ищет признаки свободного домена в теле ответа"""
+        if not self.stream_body:
+            html = await response.text()
+            return self.domain_free_detector.search(html)
+
+        # Читаем тело кусками до совпадения или до лимита байт
+        scanner = self.domain_free_detector.scanner()
+        decoder = None
+        charset = (response.charset or '').lower()
+        if charset.startswith(('utf-16', 'utf-32')):
+            # Не ASCII-совместимые кодировки приходится декодировать
+            decoder = codecs.getincrementaldecoder(charset)(errors='replace')
+        bytes_read = 0
+        async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+            chunk = chunk[:self.max_body_bytes - bytes_read]
+            bytes_read += len(chunk)
+            signature = scanner.feed(decoder.decode(chunk) if decoder else chunk)
+            if signature or bytes_read >= self.max_body_bytes:
+                return signature
+        return None
+
+    async def _release_for_reuse(self, response: aiohttp.ClientResponse):
+        """Дочитывает небольшое тело ответа, чтобы соединение вернулось в пул"""
+        if not self.pooled:
+            return
+        length = response.content_length
+        if length is not None and length > REDIRECT_DRAIN_BYTES:
+            return
+        try:
+            await response.content.read(REDIRECT_DRAIN_BYTES)
+        except Exception:
+            pass
+
+    def _url_key(self, url: str) -> str:
+        """Ключ страницы (схема, хост и путь) для кэша уже проверенных адресов"""
+        parsed = urlparse(url)
+        return f"{parsed.scheme.lower()}://{parsed.netloc.lower()}{parsed.path.rstrip('/')}"
+
+    def _remember_verdict(self, urls: List[str], result: Dict):
+        """Запоминает итог проверки для всех адресов, которые к нему привели"""
+        verdict = {key: result[key] for key in VERDICT_FIELDS if key in result}
+        for url in urls:
+            self._checked_urls[self._url_key(url)] = verdict
+
+    async def _classify_response(self, response: aiohttp.ClientResponse, result: Dict):
+        """Определение типа результата по конечному (не редиректному) ответу"""
+        if response.status == 200:
+            # Валидаторы для условных запросов при следующей перепроверке
+            if response.headers.get('ETag'):
+                result['etag'] = response.headers['ETag']
+            if response.headers.get('Last-Modified'):
+                result['last_modified'] = response.headers['Last-Modified']
+            signature = await self._detect_domain_free(response)
+            result['is_domain_free'] = signature is not None
+            if result['is_domain_free']:
+                result['domain_free_signature'] = signature
+                result['error_type'] = 'domain_free'
+            else:
+                result['error_type'] = 'available'
+        elif response.status == 403:
+            result['error_type'] = 'blocked_by_ip'
+        elif response.status == 404:
+            result['error_type'] = 'not_found'
+        elif response.status == 500:
+            result['error_type'] = 'server_error'
+        else:
+            result['error_type'] = f'http_error_{response.status}'
+
+    async def check_final_url(self, session: aiohttp.ClientSession, url: str,
+                              visited: Optional[List[str]] = None) -> Dict:
+        """Проверка конечного URL: проход по цепочке редиректов до итогового ответа"""
         result = {
             'final_url': url,
             'status': 'error',
             'response_time': 0,
             'error_type': None,
-            'is_domain_free': False
+            'is_domain_free': False,
+            'redirect_chain': []
         }
+        # Адреса без фрагмента, на которых уже были в этой цепочке
+        seen = {urldefrag(u).url for u in visited or []}
+        chain_urls = []
 
         try:
-            start_time = datetime.now()
-            async with session.get(url, timeout=30, ssl=False) as response:
-                result['response_time'] = (datetime.now() - start_time).total_seconds()
-                result['status'] = response.status
-                
-                if response.status == 200:
-                    html = await response.text()
-                    result['is_domain_free'] = self.check_domain_free(html)
-                    if result['is_domain_free']:
-                        result['error_type'] = 'domain_free'
+            for _ in range(self.max_redirects):
+                if urldefrag(url).url in seen:
+                    result['error_type'] = 'redirect_loop'
+                    break
+                seen.add(urldefrag(url).url)
+
+                # Этот адрес уже проверялся в текущем запуске - берем готовый итог
+                cached = self._checked_urls.get(self._url_key(url))
+                if cached is not None:
+                    result.update(cached)
+                    result['from_cache'] = True
+                    self._remember_verdict(chain_urls, cached)
+                    break
+
+                chain_urls.append(url)
+                location = None
+                start_time = datetime.now()
+                async with session.get(url, timeout=30, allow_redirects=False, ssl=False) as response:
+                    hop_time = (datetime.now() - start_time).total_seconds()
+                    result['redirect_chain'].append({'url': url, 'status': response.status, 'response_time': hop_time})
+                    result['final_url'] = url
+                    result['status'] = response.status
+                    result['response_time'] = hop_time
+
+                    if response.status in REDIRECT_STATUSES:
+                        location = response.headers.get('Location')
+                    if location:
+                        await self._release_for_reuse(response)
                     else:
-                        result['error_type'] = 'available'
-                elif response.status == 403:
-                    result['error_type'] = 'blocked_by_ip'
-                elif response.status == 404:
-                    result['error_type'] = 'not_found'
-                elif response.status == 500:
-                    result['error_type'] = 'server_error'
-                else:
-                    result['error_type'] = f'http_error_{response.status}'
+                        await self._classify_response(response, result)
+
+                if not location:
+                    self._remember_verdict(chain_urls, result)
+                    break
+                # Location может быть относительным
+                url = urljoin(url, location)
+            else:
+                result['error_type'] = 'too_many_redirects'
 
         except Exception as e:
             result['error_type'] = 'unknown_error'
@@ -160,8 +419,19 @@ class SiteChecker:
 
         return result
 
-    async def check_site(self, session: aiohttp.ClientSession, url: str) -> Dict:
-        """Проверка одного сайта"""
+    def _conditional_headers(self, previous: Optional[Dict]) -> Dict:
+        """If-None-Match / If-Modified-Since по сохраненным ETag и Last-Modified"""
+        headers = {}
+        if previous and previous['status'] in (200, 304):
+            if previous.get('etag'):
+                headers['If-None-Match'] = previous['etag']
+            if previous.get('last_modified'):
+                headers['If-Modified-Since'] = previous['last_modified']
+        return headers
+
+    async def check_site(self, session: aiohttp.ClientSession, url: str, timeout: float = 30,
+                         previous: Optional[Dict] = None) -> Dict:
+        """Проверка одного сайта (previous - прошлый результат для условного запроса)"""
         result = {
             'url': url,
             'status': 'error',
@@ -175,37 +445,36 @@ class SiteChecker:
 
         try:
             start_time = datetime.now()
-            async with session.get(url, timeout=30, allow_redirects=False, ssl=False) as response:
+            headers = self._conditional_headers(previous)
+            async with session.get(url, timeout=timeout, allow_redirects=False, ssl=False,
+                                   headers=headers) as response:
                 result['response_time'] = (datetime.now() - start_time).total_seconds()
                 result['status'] = response.status
 
+                # Страница не менялась с прошлой проверки - итог тот же
+                redirect_url = None
+                if response.status == 304 and headers:
+                    result['not_modified'] = True
+                    for key in ('error_type', 'is_domain_free', 'domain_free_signature', 'etag', 'last_modified'):
+                        if key in previous:
+                            result[key] = previous[key]
+
                 # Проверка редиректов
-                if response.status in (301, 302, 303, 307, 308):
+                elif response.status in REDIRECT_STATUSES:
                     redirect_url = response.headers.get('Location')
-                    result['redirect_url'] = redirect_url
                     result['error_type'] = 'redirect'
-                    
-                    # Проверка конечного URL
+                    await self._release_for_reuse(response)
                     if redirect_url:
-                        result['final_url_check'] = await self.check_final_url(session, redirect_url)
-                    return result
+                        result['redirect_url'] = urljoin(url, redirect_url)
 
                 # Проверка доступности
-                if response.status == 200:
-                    html = await response.text()
-                    result['is_domain_free'] = self.check_domain_free(html)
-                    if result['is_domain_free']:
-                        result['error_type'] = 'domain_free'
-                    else:
-                        result['error_type'] = 'available'
-                elif response.status == 403:
-                    result['error_type'] = 'blocked_by_ip'
-                elif response.status == 404:
-                    result['error_type'] = 'not_found'
-                elif response.status == 500:
-                    result['error_type'] = 'server_error'
                 else:
-                    result['error_type'] = f'http_error_{response.status}'
+                    await self._classify_response(response, result)
+                    self._remember_verdict([url], {**result, 'final_url': url})
+
+            # Проверка конечного URL (после выхода из ответа, чтобы соединение могло переиспользоваться)
+            if result['redirect_url']:
+                result['final_url_check'] = await self.check_final_url(session, result['redirect_url'], visited=[url])
 
         except aiohttp.ClientError as e:
             result['error_type'] = 'connection_error'
@@ -218,50 +487,236 @@ class SiteChecker:
 
         return result
 
+    def _host_key(self, url: str) -> str:
+        """Ключ хоста для лимитов и пауз"""
+        parsed = urlparse(url if '://' in url else f'//{url}')
+        return (parsed.hostname or url).lower()
+
+    async def _wait_host_turn(self, host: str):
+        """Пауза перед запросом к хосту (со случайным разбросом)"""
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        ready_at = max(now, self._host_next_time.get(host, now))
+        # Резервируем следующее окно сразу, чтобы параллельные задачи к тому же хосту не стартовали вместе
+        self._host_next_time[host] = ready_at + random.uniform(*self.host_delay_range)
+        if ready_at > now:
+            await asyncio.sleep(ready_at - now)
+
+    def _dns_not_found_result(self, url: str) -> Dict:
+        """Результат для несуществующего домена - без HTTP-запроса"""
+        return {
+            'url': url if urlparse(url).scheme else f'http://{url}',
+            'status': 'error',
+            'response_time': 0,
+            'error_type': 'dns_not_found',
+            'redirect_url': None,
+            'final_url_check': None,
+            'is_domain_free': False,
+            'check_time': datetime.now().isoformat(),
+            'error_message': f'DNS: домен {self._host_key(url)} не знайдено'
+        }
+
+    async def _throttled_check(self, session: aiohttp.ClientSession, url: str,
+                               previous: Optional[Dict] = None) -> Dict:
+        """Нормализация и проверка сайта с учетом глобального лимита и лимита на хост"""
+        host = self._host_key(url)
+        if self.resolver and self.resolver.is_not_found(host):
+            return self._dns_not_found_result(previous['url'] if previous else url)
+        host_semaphore = self._host_semaphores.get(host)
+        if host_semaphore is None:
+            host_semaphore = self._host_semaphores[host] = asyncio.Semaphore(self.per_host_limit)
+
+        # Сначала ждем свой хост, чтобы не занимать глобальный слот впустую
+        async with host_semaphore:
+            await self._wait_host_turn(host)
+            async with self._global_semaphore:
+                if previous:
+                    # Протокол уже известен по прошлой проверке
+                    return await self.check_site(session, previous['url'], previous=previous)
+                url, result = await self.normalize_url(session, url)
+                if result is None:
+                    result = await self.check_site(session, url)
+                return result
+
+    def _create_trace_config(self) -> aiohttp.TraceConfig:
+        """Счетчики новых и переиспользованных соединений"""
+        async def on_connection_create_end(session, context, params):
+            self.connection_stats['new'] += 1
+
+        async def on_connection_reuseconn(session, context, params):
+            self.connection_stats['reused'] += 1
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        return trace_config
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        """Общая сессия для всех запросов (пул keep-alive соединений или закрытие после каждого)"""
+        # Резолвы берутся из общего кэша CachingResolver, собственный кэш коннектора не нужен
+        dns_options = {'resolver': self.resolver, 'use_dns_cache': False} if self.resolver else {}
+        if self.pooled:
+            connector = aiohttp.TCPConnector(
+                ssl=False,
+                limit=self.pool_limit,
+                limit_per_host=self.pool_limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                **dns_options
+            )
+        else:
+            connector = aiohttp.TCPConnector(ssl=False, force_close=True, **dns_options)
+        timeout = aiohttp.ClientTimeout(total=30)
+        return aiohttp.ClientSession(
+            headers=BROWSER_HEADERS,
+            connector=connector,
+            timeout=timeout,
+            trace_configs=[self._create_trace_config()]
+        )
+
     async def check_all_sites(self):
         """Проверка всех сайтов"""
         sites = await self.get_sites_from_sheet()
+        # Пропускаем сайты, уже проверенные в продолжаемом запуске
+        pending = [(i, url) for i, url in enumerate(sites) if site_key(url) not in self.checked_sites]
+        if len(pending) < len(sites):
+            print(f"⏭️ Пропущено {len(sites) - len(pending)} вже перевірених сайтів")
+
+        # Сайты, которые по истории еще рано перепроверять, переносим с прошлым результатом
+        scheduled, carried = [], []
+        for index, url in pending:
+            history = self.previous_history.get(site_key(url))
+            if history and not self._is_due(history):
+                carried.append((index, history[-1]))
+            else:
+                scheduled.append((index, url, history[-1] if history else None))
+        # Строка с тем же URL, что уже проверен, но без своей записи в файле, получает копию результата
+        for index, url in enumerate(sites):
+            if site_key(url) in self.checked_sites and index not in self.checked_indexes:
+                carried.append((index, self.checked_sites[site_key(url)]))
+        if self.previous_history:
+            print(f"🗓️ До перевірки {len(scheduled)}, перенесено з минулих результатів {len(carried)}")
+        self._global_semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        # Предварительный параллельный резолв всех хостов: несуществующие домены отсеиваются без HTTP
+        if self.dns_prefetch:
+            self.resolver = CachingResolver()
+            print("🌐 Резолв доменів...")
+            await self.resolver.prefetch(self._host_key(url) for _, url, _ in scheduled)
+            print(f"✅ DNS: {self.resolver.stats['lookups']} запитів, "
+                  f"не знайдено {self.resolver.stats['not_found']} доменів")
         print("\n🔄 Початок перевірки сайтів...")
         
         # Создаем сессию с настройками браузера
-        connector = aiohttp.TCPConnector(ssl=False, force_close=True)
-        timeout = aiohttp.ClientTimeout(total=30)
-        
-        async with aiohttp.ClientSession(
-            headers=BROWSER_HEADERS,
-            connector=connector,
-            timeout=timeout
-        ) as session:
+        async with self._create_session() as session:
             # Создаем прогресс-бар
-            pbar = tqdm(total=len(sites), desc="Перевірка", 
+            pbar = tqdm(total=len(sites), initial=len(sites) - len(scheduled), desc="Перевірка", 
                        bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt} {elapsed}<{remaining}',
                        ncols=100)
-            
-            for i, url in enumerate(sites, 1):
-                # Обновляем описание прогресс-бара
-                pbar.set_description(f"{i}/{len(sites)} {url}")
-                result = await self.check_site(session, url)
-                self.results.append(result)
+
+            # Каждый результат сразу пишется в JSONL; индекс сохраняет порядок таблицы
+            self.writer = JsonlResultWriter(self.results_path)
+            for index, result in carried:
+                self.writer.write({**result, 'index': index, 'carried_over': True})
+
+            async def run(index: int, url: str, previous: Optional[Dict]):
+                result = await self._throttled_check(session, url, previous)
+                self.writer.write({**result, 'index': index})
+                pbar.set_description(f"{pbar.n + 1}/{len(sites)} {url}")
                 pbar.update(1)
-                
-                # Добавляем небольшую задержку между запросами
-                await asyncio.sleep(random.uniform(0.5, 1.5))
+
+            async def flush_periodically():
+                # Медленные сайты могут долго не давать write(): сбрасываем буфер и по таймеру
+                while True:
+                    await asyncio.sleep(self.writer.flush_interval)
+                    self.writer.flush_if_due()
+
+            flusher = asyncio.create_task(flush_periodically())
+            try:
+                await asyncio.gather(*(run(i, url, previous) for i, url, previous in scheduled))
+            finally:
+                flusher.cancel()
+                self.writer.close()
             
             pbar.close()
+            if self.resolver:
+                await self.resolver.close()
             print("\n✅ Перевірка завершена")
+            print(f"🔌 З'єднань: нових {self.connection_stats['new']}, "
+                  f"перевикористаних {self.connection_stats['reused']}")
 
     def save_results(self):
-        """Сохранение результатов в JSON файл"""
-        filename = f'results_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(self.results, f, ensure_ascii=False, indent=2)
-        print(f"💾 Результати збережено у файл: {filename}")
+        """Сохранение результатов в JSON файл (из потокового JSONL)"""
+        filename = os.path.join(os.path.dirname(self.results_path), f'results_{self.run_id}.json')
+        jsonl_to_json(self.results_path, filename)
+        print(f"💾 Результати збережено у файл: {filename} (потоково: {self.results_path})")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Перевірка доступності сайтів з Google Sheets")
+    parser.add_argument('--concurrency', type=int, default=MAX_CONCURRENCY,
+                        help='скільки сайтів перевіряти одночасно')
+    parser.add_argument('--per-host', type=int, default=PER_HOST_LIMIT,
+                        help='одночасних запитів до одного хоста')
+    parser.add_argument('--delay', type=float, nargs=2, default=HOST_DELAY_RANGE,
+                        metavar=('MIN', 'MAX'), help='пауза між запитами до одного хоста, сек')
+    parser.add_argument('--no-pool', action='store_true',
+                        help="закривати з'єднання після кожного запиту (як раніше)")
+    parser.add_argument('--pool-limit', type=int, default=POOL_LIMIT,
+                        help="максимум з'єднань у пулі")
+    parser.add_argument('--pool-per-host', type=int, default=POOL_LIMIT_PER_HOST,
+                        help="максимум з'єднань у пулі на один хост")
+    parser.add_argument('--keepalive', type=float, default=KEEPALIVE_TIMEOUT,
+                        help="скільки секунд тримати вільне з'єднання відкритим")
+    parser.add_argument('--no-stream', action='store_true',
+                        help='завантажувати сторінку повністю замість читання частинами')
+    parser.add_argument('--max-body-bytes', type=int, default=MAX_BODY_BYTES,
+                        help='скільки байт сторінки максимум переглядати')
+    parser.add_argument('--max-redirects', type=int, default=MAX_REDIRECTS,
+                        help='скільки редиректів максимум проходити')
+    parser.add_argument('--resume', nargs='?', const='latest', metavar='RESULTS.jsonl',
+                        help='продовжити перерваний запуск (за замовчуванням останній results_*.jsonl)')
+    parser.add_argument('--max-age', type=float, default=RESUME_MAX_AGE_HOURS,
+                        help='не перевіряти повторно сайти, перевірені не раніше ніж стільки годин тому')
+    parser.add_argument('--retry-errors', action='store_true',
+                        help="при продовженні перевірити повторно сайти з помилками з'єднання і таймаутами")
+    parser.add_argument('--previous', nargs='+', metavar='RESULTS',
+                        help='попередні результати (.json/.jsonl): стабільні сайти перевіряються рідше')
+    parser.add_argument('--no-dns-prefetch', action='store_true',
+                        help='не резолвити домени заздалегідь')
+    parser.add_argument('--storage', choices=STORAGE_KINDS,
+                        help='де таблиця: google або local (CSV для замірів без мережі); за замовчуванням - з SHEETS_STORAGE')
+    return parser.parse_args()
 
 async def main():
-    checker = SiteChecker()
+    args = parse_args()
+    set_storage(create_storage(args.storage, scopes=SCOPES))
+    resume_path = args.resume
+    if resume_path == 'latest':
+        resume_path = find_latest_results()
+        if not resume_path:
+            print("ℹ️ Немає результатів для продовження, починаємо з нуля")
+    checker = SiteChecker(
+        max_concurrency=args.concurrency,
+        per_host_limit=args.per_host,
+        host_delay_range=tuple(args.delay),
+        pooled=not args.no_pool,
+        pool_limit=args.pool_limit,
+        pool_limit_per_host=args.pool_per_host,
+        keepalive_timeout=args.keepalive,
+        stream_body=not args.no_stream,
+        max_body_bytes=args.max_body_bytes,
+        max_redirects=args.max_redirects,
+        resume_path=resume_path,
+        resume_max_age=timedelta(hours=args.max_age),
+        retry_errors=args.retry_errors,
+        previous_paths=args.previous,
+        dns_prefetch=not args.no_dns_prefetch
+    )
     await checker.setup_google_sheets()
     await checker.check_all_sites()
     checker.save_results()
+    storage_summary = get_storage().summary()
+    if storage_summary:
+        print(storage_summary)
 
 if __name__ == '__main__':
     asyncio.run(main())
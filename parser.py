@@ -1,39 +1,155 @@
-import gspread
-from google.oauth2.service_account import Credentials
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
 import logging
-from urllib.parse import urljoin
-from langdetect import detect
-from deep_translator import GoogleTranslator
+from urllib.parse import urljoin, urlparse, unquote
+from translation import get_translator
+from site_language import get_language_detector
+from html_backend import parse_html
+from sheet_sync import SheetSync
+from storage import STORAGE_KINDS, create_storage, get_storage, set_storage
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import argparse
+import asyncio
+import threading
+import html as html_lib
 import re
 import time
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
-# Глобальная переменная для кэширования клиента Google Sheets
-_client = None
+# Глобальный загрузчик страниц (одна сессия и один кэш страниц на запуск)
+_fetcher = None
+# Общий пул для страниц контактов: один на запуск, сколько бы сайтов ни обрабатывалось одновременно
+_contact_executor = None
 
-def authenticate_google_sheets():
-    global _client
-    if (_client is not None):
-        return _client
+REQUEST_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3"
+}
+REQUEST_TIMEOUT = 10
+PAGE_CACHE_SIZE = 256  # Сколько последних страниц держим в памяти
+POOL_SIZE = 20  # Размер пула соединений сессии
 
-    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-    try:
-        creds = Credentials.from_service_account_file("credentials.json", scopes=scope)
-        _client = gspread.authorize(creds)
-        logging.info("✅ Успешная авторизация в Google Sheets.")
-        return _client
-    except Exception as e:
-        logging.error(f"❌ Ошибка авторизации: {e}")
-        raise
+# Ключевые слова для поиска страниц с вакансиями
+JOB_KEYWORDS = ["job", "career", "careers", "jobs", "hiring", "employment", "join us", "work with us", "vacancies", "karriere" , "working at", "vacancy", "job openings"]
+# Ключевые слова для поиска позиций на странице с вакансиями
+POSITION_KEYWORDS = [
+    "Software Developer", "Data Engineer", "Software Architect",
+    "Designer", "Data Scientist", "IT Manager", "DevOps"
+]
+
+# Поиск email: регионы, которые пропускаем (скрипты, стили, data:URI с base64)
+EMAIL_SKIP_RE = re.compile(
+    r"<script\b[^>]*>.*?</script\s*>|<style\b[^>]*>.*?</style\s*>|data:[a-z]+/[a-z0-9.+-]+[^\"'\s)]*",
+    re.IGNORECASE | re.DOTALL
+)
+EMAIL_MAILTO_RE = re.compile(r"mailto:([^\"'?>\s]+)", re.IGNORECASE)
+# Один проход для обычных и обфусцированных адресов; все повторы ограничены, а начало
+# адреса не может быть в середине длинной буквенно-цифровой строки, поэтому нет катастрофического бэктрекинга
+EMAIL_RE = re.compile(
+    r"(?<![a-z0-9._%+-])([a-z0-9._%+-]{1,64})"
+    r"(?:\s?@\s?|\s*[\[(]\s*at\s*[\])]\s*)"
+    r"((?:[a-z0-9-]{1,63}(?:\.|\s*[\[(]\s*dot\s*[\])]\s*)){1,8}[a-z]{2,24})(?![a-z0-9-])",
+    re.IGNORECASE
+)
+EMAIL_DOT_RE = re.compile(r"\s*[\[(]\s*dot\s*[\])]\s*", re.IGNORECASE)
+EMAIL_IGNORED_SUFFIXES = (".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp", ".css", ".js")
+
+# Поиск email на страницах контактов
+CONTACT_KEYWORDS = ["contact", "kontakt", "impressum", "imprint", "about", "uber-uns", "ueber-uns", "über uns",
+                    "legal", "contatti", "contacto", "контакт", "о нас", "про нас"]
+CONTACT_EMAIL_THRESHOLD = 3  # Столько адресов достаточно - дальше страницы не обходим
+CONTACT_CRAWL_WORKERS = 4  # Сколько страниц контактов загружаем одновременно (на все сайты вместе)
+
+# Параметры параллельного режима
+CONCURRENCY = 10  # Сколько сайтов обрабатывается одновременно
+PER_DOMAIN_LIMIT = 1  # Сколько сайтов одного домена обрабатывается одновременно
+DOMAIN_DELAY = 1.0  # Пауза (сек) между обращениями к одному домену
+
+class Page:
+    """Загруженная страница: HTML разбирается один раз и переиспользуется всеми обработчиками"""
+
+    def __init__(self, url, response):
+        self.url = url
+        self.response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.text = response.text
+        self._document = None
+        self._language = None
+
+    def raise_for_status(self):
+        self.response.raise_for_status()
+
+    @property
+    def document(self):
+        """Разобранная страница (ссылки, meta, абзацы, текст) - самым быстрым из установленных парсеров"""
+        if self._document is None:
+            self._document = parse_html(self.text)
+        return self._document
+
+    @property
+    def language(self):
+        if self._language is None:
+            self._language = detect_page_language(self.text, url=self.url, headers=self.headers)
+        return self._language
+
+class PageFetcher:
+    """Загрузка страниц через общую сессию с пулом соединений; каждый URL скачивается один раз за запуск"""
+
+    def __init__(self, cache_size=PAGE_CACHE_SIZE, pool_size=POOL_SIZE):
+        self.session = requests.Session()
+        self.session.headers.update(REQUEST_HEADERS)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()  # url -> Page или исключение, с которым завершилась загрузка
+        self._lock = threading.Lock()
+        self.stats = {"fetched": 0, "cached": 0}
+
+    def get(self, url):
+        """Возвращает страницу (из кэша или загружая ее); ошибки загрузки тоже кэшируются"""
+        with self._lock:
+            entry = self._cache.get(url)
+            if entry is not None:
+                self._cache.move_to_end(url)
+                self.stats["cached"] += 1
+        if entry is None:
+            try:
+                entry = Page(url, self.session.get(url, timeout=REQUEST_TIMEOUT))
+            except requests.exceptions.RequestException as e:
+                entry = e
+            with self._lock:
+                self.stats["fetched"] += 1
+                self._cache[url] = entry
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        if isinstance(entry, Exception):
+            raise entry
+        return entry
 
-def get_business_websites(sheet_name):
+def get_page_fetcher():
+    global _fetcher
+    if _fetcher is None:
+        _fetcher = PageFetcher()
+    return _fetcher
+
+def get_contact_executor():
+    global _contact_executor
+    if _contact_executor is None:
+        _contact_executor = ThreadPoolExecutor(max_workers=CONTACT_CRAWL_WORKERS, thread_name_prefix="contacts")
+    return _contact_executor
+
+def open_sheet(sheet_name):
+    """Первый лист таблицы (Google Sheets или локальная замена - см. storage.py)"""
+    return get_storage().open_worksheet(sheet_name)
+
+def get_business_websites(sheet_name, sheet=None):
     try:
-        client = authenticate_google_sheets()
-        sheet = client.open(sheet_name).sheet1
+        if sheet is None:
+            sheet = open_sheet(sheet_name)
         websites = sheet.col_values(1)
         num_sites = len(websites) - 1
         logging.info(f"📌 Получено {num_sites} сайтов из таблицы.")
@@ -53,85 +169,172 @@ def get_business_websites(sheet_name):
         logging.error(f"❌ Ошибка при чтении данных из таблицы: {e}")
         return []
 
-def detect_page_language(html):
-    try:
-        soup = BeautifulSoup(html, "html.parser")
-        lang_tag = soup.find("html").get("lang")
-        if lang_tag:
-            return lang_tag.split("-")[0]
-        return detect(html)
-    except Exception as e:
-        logging.warning(f"⚠️ Не удалось определить язык страницы: {e}")
-        return "en"
+def detect_page_language(html, url="", headers=None):
+    """Язык страницы по lang/Content-Language/og:locale, иначе по видимому тексту; по умолчанию английский"""
+    return get_language_detector().detect(url, html, headers, default="en")
 
 def translate_keywords(keywords, target_lang):
+    """Перевод ключевых слов с английского; None, если перевести не удалось"""
     try:
-        translated_keywords = [GoogleTranslator(source="en", target=target_lang).translate(word) for word in keywords]
+        translated_keywords = get_translator().translate_many(keywords, "en", target_lang)
         logging.info(f"🌍 Ключевые слова переведены на {target_lang}: {translated_keywords}")
         return translated_keywords
     except Exception as e:
         logging.error(f"❌ Ошибка перевода ключевых слов: {e}")
-        return keywords
+        return None
+
+class KeywordMatcher:
+    """Поиск любого из ключевых слов (без учета регистра) одним скомпилированным выражением"""
+
+    def __init__(self, keywords):
+        # Пустые переводы отбрасываем: пустая строка совпала бы с любой ссылкой
+        self.keywords = sorted({keyword.lower() for keyword in keywords if keyword}, key=len, reverse=True)
+        self.pattern = re.compile("|".join(re.escape(keyword) for keyword in self.keywords)) if self.keywords else None
+
+    def search(self, text):
+        """Первое найденное ключевое слово или None (text должен быть в нижнем регистре)"""
+        if self.pattern is None:
+            return None
+        match = self.pattern.search(text)
+        return match.group(0) if match else None
+
+class JobLinkMatcher:
+    """Английские и переведенные ключевые слова вакансий в одном выражении: каждая ссылка проверяется один раз"""
+
+    def __init__(self, keywords, translated_keywords=()):
+        self.english = KeywordMatcher(keywords)
+        self.translated = KeywordMatcher(translated_keywords)
+        self.combined = KeywordMatcher(list(keywords) + list(translated_keywords))
+
+    def match(self, href):
+        """Возвращает (совпало английское слово, совпало переведенное слово)"""
+        keyword = self.combined.search(href)
+        if keyword is None:
+            return False, False
+        # Нашлось слово одного из наборов - второй набор проверяем только для таких (редких) ссылок
+        is_english = keyword in self.english.keywords or self.english.search(href) is not None
+        is_translated = keyword in self.translated.keywords or self.translated.search(href) is not None
+        return is_english, is_translated
 
-def find_job_pages(url):
+class PrefixTrie:
+    """Префиксное дерево: есть ли среди добавленных строк префикс данной строки"""
+
+    def __init__(self):
+        self.root = {}
+
+    def add(self, prefix):
+        node = self.root
+        for char in prefix:
+            node = node.setdefault(char, {})
+        node[None] = True
+
+    def has_prefix_of(self, text):
+        node = self.root
+        for char in text:
+            if None in node:
+                return True
+            node = node.get(char)
+            if node is None:
+                return False
+        return None in node
+
+class PositionMatcher:
+    """
+    Поиск всех позиций за один проход по тексту. Переведенные названия заранее
+    сопоставлены английским, поэтому для найденных совпадений не нужны ни определение языка, ни перевод.
+    """
+
+    def __init__(self, keywords, translated_keywords=()):
+        self.keywords = list(keywords)
+        # Вариант в нижнем регистре -> каноническое английское название
+        self.canonical = {keyword.lower(): keyword for keyword in keywords}
+        for keyword, translated in zip(keywords, translated_keywords):
+            if translated:
+                self.canonical.setdefault(translated.lower(), keyword)
+        variants = sorted(self.canonical, key=len, reverse=True)
+        # Опережающая проверка находит совпадения в каждой позиции, в том числе перекрывающиеся
+        self.pattern = re.compile("(?=(" + "|".join(re.escape(variant) for variant in variants) + "))")
+        # В одной позиции берется самый длинный вариант, вложенные в него варианты учитываем отдельно
+        self.contained = {variant: [other for other in variants if other != variant and other in variant]
+                          for variant in variants}
+
+    def find_all(self, text):
+        """Английские названия найденных позиций в порядке списка ключевых слов (text - в нижнем регистре)"""
+        found = set()
+        for match in self.pattern.finditer(text):
+            variant = match.group(1)
+            if variant not in found:
+                found.add(variant)
+                found.update(self.contained[variant])
+                if len(found) == len(self.canonical):
+                    break
+        positions = {self.canonical[variant] for variant in found}
+        return [keyword for keyword in self.keywords if keyword in positions]
+
+CONTACT_MATCHER = KeywordMatcher(CONTACT_KEYWORDS)
+
+# Матчеры ссылок и позиций по языку страницы (строятся один раз на язык)
+_link_matchers = {}
+_position_matchers = {}
+
+def _language_matcher(cache, matcher_class, keywords, page_lang):
+    """Матчер для языка страницы: английские слова и их перевод; строится один раз на язык"""
+    matcher = cache.get(page_lang)
+    if matcher is None:
+        translated_keywords = [] if page_lang == "en" else translate_keywords(keywords, page_lang)
+        matcher = matcher_class(keywords, translated_keywords or [])
+        # Если перевод не удался, ищем только по-английски и попробуем перевести на следующей странице
+        if translated_keywords is not None:
+            cache[page_lang] = matcher
+    return matcher
+
+def get_position_matcher(page_lang):
+    return _language_matcher(_position_matchers, PositionMatcher, POSITION_KEYWORDS, page_lang)
+
+def get_link_matcher(page_lang):
+    return _language_matcher(_link_matchers, JobLinkMatcher, JOB_KEYWORDS, page_lang)
+
+def collect_job_links(url, hrefs):
+    """
+    Абсолютные ссылки на вакансии без подкаталогов других найденных ссылок:
+    если есть /careers, то /careers/ и /careers/developer отдельно не нужны.
+    """
+    job_links = set()
+    base_links = PrefixTrie()  # Каталоги уже взятых ссылок
+    # От коротких к длинным: базовая ссылка попадает в дерево раньше своих подкаталогов
+    for full_url in sorted({urljoin(url, href) for href in hrefs}, key=len):
+        if base_links.has_prefix_of(full_url):
+            continue
+        job_links.add(full_url)
+        base_links.add(full_url.split("#")[0].split("?")[0].rstrip("/") + "/")
+    return job_links
+
+def find_job_pages(url, fetcher=None):
     try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3"
-        }
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, "html.parser")
-        
-        page_lang = detect_page_language(response.text)
-        keywords = ["job", "career", "careers", "jobs", "hiring", "employment", "join us", "work with us", "vacancies", "karriere" , "working at", "vacancy", "job openings"]
+        page = (fetcher or get_page_fetcher()).get(url)
+        page.raise_for_status()
         
-        job_links = set()
-        base_links = set()  # Для хранения базовых ссылок
+        page_lang = page.language
+        matcher = get_link_matcher(page_lang)
         
-        for link in soup.find_all("a", href=True):
-            href = link["href"].lower()
-            if href.startswith("mailto:"):
+        # Один проход по ссылкам сразу для английских и переведенных ключевых слов
+        english_hrefs = []
+        translated_hrefs = []
+        for href, _ in page.document.links:
+            if href.lower().startswith("mailto:"):
                 continue  # Пропускаем ссылки, начинающиеся с mailto:
-            if any(keyword in href for keyword in keywords):
-                full_url = urljoin(url, link["href"])
-                
-                # Проверяем, является ли ссылка базовой или подкаталогом
-                is_subpath = False
-                for base_link in base_links:
-                    if full_url.startswith(base_link + "/"):
-                        is_subpath = True
-                        break
-                
-                # Если это не подкаталог, добавляем в список
-                if not is_subpath:
-                    job_links.add(full_url)
-                    # Если это базовая ссылка, добавляем её в base_links
-                    if not any(c in full_url for c in ["/", "?", "#"]):  # Простая проверка на базовую ссылку
-                        base_links.add(full_url)
+            is_english, is_translated = matcher.match(href.lower())
+            if is_english:
+                english_hrefs.append(href)
+            if is_translated:
+                translated_hrefs.append(href)
+        
+        job_links = collect_job_links(url, english_hrefs)
         
+        # Переведенные ключевые слова используются, только если по английским ничего не нашлось
         if not job_links and page_lang != "en":
-            logging.info(f"🌍 Переводим ключевые слова на {page_lang} и повторяем поиск для {url}.")
-            translated_keywords = translate_keywords(keywords, page_lang)
-            for link in soup.find_all("a", href=True):
-                href = link["href"].lower()
-                if href.startswith("mailto:"):
-                    continue  # Пропускаем ссылки, начинающиеся с mailto:
-                if any(keyword in href for keyword in translated_keywords):
-                    full_url = urljoin(url, link["href"])
-                    
-                    # Проверяем, является ли ссылка подкаталогом
-                    is_subpath = False
-                    for base_link in base_links:
-                        if full_url.startswith(base_link + "/"):
-                            is_subpath = True
-                            break
-                    
-                    # Если это не подкаталог, добавляем в список
-                    if not is_subpath:
-                        job_links.add(full_url)
-                        # Если это базовая ссылка, добавляем её в base_links
-                        if not any(c in full_url for c in ["/", "?", "#"]):
-                            base_links.add(full_url)
+            logging.info(f"🌍 Ищем по ключевым словам на {page_lang} для {url}.")
+            job_links = collect_job_links(url, translated_hrefs)
         
         if job_links:
             logging.info(f"🔍 Найдено {len(job_links)} страниц с вакансиями на {url}.")
@@ -149,27 +352,97 @@ def find_job_pages(url):
 def find_emails(html):
     """
     Ищет email-адреса в HTML-коде страницы.
+    Скрипты, стили и data:URI пропускаются; mailto-ссылки и HTML-сущности декодируются,
+    обфускации вида [at]/(at) и [dot]/(dot) раскрываются.
     """
     try:
-        email_patterns = [
-            r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}",
-            r"[a-zA-Z0-9._%+-]+\s@\s[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}",
-            r"[a-zA-Z0-9._%+-]+\s\(at\)\s[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}",
-            r"[a-zA-Z0-9._%+-]+\s*\(at\)\s*[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}"
-        ]
-        emails = set()
-        for pattern in email_patterns:
-            matches = re.findall(pattern, html)
-            for match in matches:
-                cleaned_email = match.replace(" ", "").replace("(at)", "@")
-                emails.add(cleaned_email)
+        text = EMAIL_SKIP_RE.sub(" ", html)
+        # Адреса из mailto: могут быть закодированы (%40 и т.п.)
+        mailto = " ".join(unquote(address) for address in EMAIL_MAILTO_RE.findall(text))
+        text = html_lib.unescape(text)
+        
+        emails = {}
+        for chunk in (mailto, text):
+            for local, domain in EMAIL_RE.findall(chunk):
+                email = f"{local}@{EMAIL_DOT_RE.sub('.', domain)}"
+                if email.lower().endswith(EMAIL_IGNORED_SUFFIXES):
+                    continue  # Имена файлов вида logo@2x.png
+                emails.setdefault(email.lower(), email)
         logging.info(f"📧 Найдено {len(emails)} email-адресов.")
-        return list(emails)
+        return list(emails.values())
     except Exception as e:
         logging.error(f"❌ Ошибка при поиске email-адресов: {e}")
         return []
 
+def site_host(url):
+    """Хост без www. - чтобы www.example.com и example.com считались одним сайтом"""
+    host = (urlparse(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+def contact_page_links(page, website):
+    """
+    Ссылки на страницы контактов/импрессума/о компании того же сайта (в порядке появления).
+    Относительные ссылки считаются от адреса после редиректов.
+    """
+    base = page.response.url or website
+    host = site_host(base)
+    links = []
+    for href, text in page.document.links:
+        if href.lower().startswith(("mailto:", "tel:", "javascript:")):
+            continue
+        # Ключевое слово ищем и в адресе, и в тексте ссылки
+        if CONTACT_MATCHER.search(href.lower()) is None and CONTACT_MATCHER.search(text.lower()) is None:
+            continue
+        full_url = urljoin(base, href).split("#")[0]
+        if site_host(full_url) == host and full_url not in (website, base) and full_url not in links:
+            links.append(full_url)
+    return links
+
+def merge_emails(emails, new_emails):
+    """Добавляет новые адреса без дубликатов (без учета регистра)"""
+    known = {email.lower() for email in emails}
+    for email in new_emails:
+        if email.lower() not in known:
+            known.add(email.lower())
+            emails.append(email)
+    return emails
+
+def find_site_emails(website, fetcher=None, max_pages=0, min_emails=CONTACT_EMAIL_THRESHOLD):
+    """
+    Ищет email на главной странице и, если нужно, на страницах контактов.
+    Обходится не больше max_pages страниц (параллельно, через общие на запуск пул потоков и сессию);
+    обход останавливается, как только найдено min_emails адресов.
+    """
+    fetcher = fetcher or get_page_fetcher()
+    page = fetcher.get(website)
+    emails = find_emails(page.text)
+    if max_pages <= 0 or len(emails) >= min_emails:
+        return emails
+    
+    candidates = contact_page_links(page, website)[:max_pages]
+    if not candidates:
+        return emails
+    logging.info(f"📇 Проверяем страницы контактов на {website}: {len(candidates)}")
+    futures = [get_contact_executor().submit(fetcher.get, url) for url in candidates]
+    try:
+        for future in as_completed(futures):
+            try:
+                merge_emails(emails, find_emails(future.result().text))
+            except requests.exceptions.RequestException:
+                continue
+            if len(emails) >= min_emails:
+                break
+    finally:
+        # Оставшиеся в очереди страницы не загружаем
+        for future in futures:
+            future.cancel()
+    return emails
+
 def write_job_urls_and_emails_to_sheet(sheet, row, job_urls, emails):
+    """
+    Записывает страницы вакансий и email; найденные адреса добавляются к уже записанным.
+    sheet - лучше SheetSync: тогда чтение старых адресов идет из памяти, а запись - пакетом.
+    """
     try:
         if job_urls:
             sheet.update_cell(row, 2, ", ".join(job_urls))
@@ -177,52 +450,32 @@ def write_job_urls_and_emails_to_sheet(sheet, row, job_urls, emails):
             sheet.update_cell(row, 2, "нет URL")
         
         existing_emails = sheet.cell(row, 3).value
-        if existing_emails:
-            emails = list(set(existing_emails.split(", ") + emails))
+        if existing_emails and existing_emails != "нет email":
+            # Сначала уже записанные адреса, потом новые - порядок не меняется от запуска к запуску
+            emails = merge_emails(existing_emails.split(", "), emails)
         if emails:
             sheet.update_cell(row, 3, ", ".join(emails))
         else:
             sheet.update_cell(row, 3, "нет email")
         
-        logging.info(f"✅ Данные для строки {row} успешно записаны в Google Sheets.")
+        logging.info(f"✅ Данные для строки {row} подготовлены к записи в Google Sheets.")
     except Exception as e:
         logging.error(f"❌ Ошибка при записи данных в таблицу для строки {row}: {e}")
 
-def parse_job_page(url):
+def parse_job_page(url, fetcher=None):
     """
     Парсит страницу с вакансиями и ищет ключевые слова.
     """
     try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3"
-        }
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, "html.parser")
+        page = (fetcher or get_page_fetcher()).get(url)
+        page.raise_for_status()
         
         # Определяем язык страницы
-        page_lang = detect_page_language(response.text)
-        
-        # Ключевые слова для поиска
-        keywords = [
-            "Software Developer", "Data Engineer", "Software Architect",
-            "Designer", "Data Scientist", "IT Manager", "DevOps"
-        ]
-        
-        # Если язык не английский, переводим ключевые слова
-        if page_lang != "en":
-            translated_keywords = translate_keywords(keywords, page_lang)
-            keywords.extend(translated_keywords)
+        page_lang = page.language
         
-        # Ищем ключевые слова на странице
-        found_positions = set()
-        for keyword in keywords:
-            if keyword.lower() in soup.get_text().lower():
-                if detect(keyword) != "en":  # Если ключевое слово не на английском, переводим
-                    translated = GoogleTranslator(source=page_lang, target="en").translate(keyword)
-                    found_positions.add(translated)
-                else:
-                    found_positions.add(keyword)
+        # Все позиции (английские и переведенные) ищем за один проход по тексту, извлеченному один раз
+        matcher = get_position_matcher(page_lang)
+        found_positions = matcher.find_all(page.document.text.lower())
         
         if found_positions:
             return ", ".join(found_positions)
@@ -235,31 +488,113 @@ def parse_job_page(url):
         logging.error(f"❌ Ошибка при парсинге страницы {url}: {e}")
         return "Error parsing page"
 
-def update_open_positions(sheet, row, job_urls):
+def collect_open_positions(job_urls, fetcher=None):
+    """
+    Парсит страницы с вакансиями и возвращает значение для колонки Open Position.
+    """
+    results = []
+    for url in job_urls:
+        if url:  # Пропускаем пустые строки
+            result = parse_job_page(url, fetcher)
+            results.append(result)
+    return ", ".join(results) if results else "No relevant positions found"
+
+def update_open_positions(sheet, row, job_urls, fetcher=None, positions=None):
     """
     Обновляет колонку Open Position для заданной строки.
     """
     try:
-        results = []
-        for url in job_urls:
-            if url:  # Пропускаем пустые строки
-                result = parse_job_page(url)
-                results.append(result)
+        if positions is None:
+            positions = collect_open_positions(job_urls, fetcher)
         
         # Записываем результат в колонку Open Position
-        if results:
-            sheet.update_cell(row, 4, ", ".join(results))
-        else:
-            sheet.update_cell(row, 4, "No relevant positions found")
+        sheet.update_cell(row, 4, positions)
         
         logging.info(f"✅ Колонка Open Position для строки {row} успешно обновлена.")
     except Exception as e:
         logging.error(f"❌ Ошибка при обновлении колонки Open Position для строки {row}: {e}")
 
-def main():
-    sheet_name = "Parser"
+def collect_site_data(website, fetcher, contact_pages=0):
+    """
+    Собирает данные сайта без записи в таблицу: страницы вакансий, email и открытые позиции.
+    """
+    logging.info(f"🔍 Обработка сайта: {website}")
+    
+    # Поиск страниц с вакансиями
+    job_urls = find_job_pages(website, fetcher)
+    
+    # Поиск email-адресов (страница уже загружена при поиске вакансий)
+    try:
+        emails = find_site_emails(website, fetcher, contact_pages)
+    except requests.exceptions.RequestException as e:
+        logging.error(f"❌ Не удалось загрузить {website} для поиска email: {e}")
+        emails = []
+    
+    # Открытые позиции
+    positions = collect_open_positions(job_urls, fetcher) if job_urls else None
+    return job_urls, emails, positions
+
+def write_site_data(sheet, row, job_urls, emails, positions):
+    """
+    Записывает собранные данные сайта в Google Sheets.
+    """
+    write_job_urls_and_emails_to_sheet(sheet, row, job_urls, emails)
+    if positions is not None:
+        update_open_positions(sheet, row, job_urls, positions=positions)
+
+async def process_sites_async(sheet, websites, fetcher, concurrency=CONCURRENCY, per_domain=PER_DOMAIN_LIMIT,
+                              domain_delay=DOMAIN_DELAY, contact_pages=0):
+    """
+    Параллельная обработка сайтов: глобальный лимит, лимит на домен и пауза между обращениями к домену.
+    Загрузка и парсинг идут в пуле потоков, запись в таблицу - по мере готовности сайтов.
+    sheet - SheetSync с auto_flush=False: буфер сбрасывается здесь же, в пуле потоков.
+    """
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    global_semaphore = asyncio.Semaphore(concurrency)
+    domain_semaphores = {}
+    domain_next_time = {}
+
+    async def wait_domain_turn(domain):
+        now = loop.time()
+        ready_at = max(now, domain_next_time.get(domain, now))
+        domain_next_time[domain] = ready_at + domain_delay
+        if ready_at > now:
+            await asyncio.sleep(ready_at - now)
+
+    async def handle(row, website):
+        domain = urlparse(website).netloc.lower()
+        if domain not in domain_semaphores:
+            domain_semaphores[domain] = asyncio.Semaphore(per_domain)
+        async with domain_semaphores[domain]:
+            await wait_domain_turn(domain)
+            async with global_semaphore:
+                try:
+                    job_urls, emails, positions = await loop.run_in_executor(
+                        executor, collect_site_data, website, fetcher, contact_pages)
+                except Exception as e:
+                    logging.error(f"❌ Ошибка при обработке сайта {website}: {e}")
+                    return
+        write_site_data(sheet, row, job_urls, emails, positions)
+        # Запись в таблицу - в пуле потоков: запрос и паузы после 429 не должны останавливать цикл событий
+        if sheet.flush_due():
+            await loop.run_in_executor(executor, sheet.flush)
+
+    try:
+        await asyncio.gather(*(handle(row, website) for row, website in enumerate(websites, start=2)))
+    finally:
+        executor.shutdown(wait=False)
+
+def main(sheet_name="Parser", use_async=False, concurrency=CONCURRENCY, per_domain=PER_DOMAIN_LIMIT, contact_pages=0):
     logging.info("🚀 Запуск парсинга...")
-    websites = get_business_websites(sheet_name)
+    try:
+        # Лист читается один раз; дальше чтения идут из памяти, а записи уходят пакетами
+        # В параллельном режиме буфер сбрасывается из пула потоков, а не внутри update_cell
+        sheet = SheetSync.open(open_sheet(sheet_name), auto_flush=not use_async)
+    except Exception as e:
+        logging.error(f"❌ Ошибка при чтении данных из таблицы: {e}")
+        return
+    websites = get_business_websites(sheet_name, sheet)
     
     if not websites:
         logging.warning("⚠️ Нет сайтов для парсинга.")
@@ -267,30 +602,50 @@ def main():
     
     logging.info("🔎 Начинаем поиск страниц с вакансиями и email-адресов...")
     
-    client = authenticate_google_sheets()
-    sheet = client.open(sheet_name).sheet1
+    fetcher = get_page_fetcher()
+    # Переводы ключевых слов для уже встречавшихся языков берутся из кэша, без обращений к переводчику
+    get_translator().prewarm(JOB_KEYWORDS + POSITION_KEYWORDS)
     
-    for row, website in enumerate(websites, start=2):  # Пропускаем заголовок
-        logging.info(f"🔍 Обработка сайта: {website}")
-        
-        # Поиск страниц с вакансиями
-        job_urls = find_job_pages(website)
-        
-        # Поиск email-адресов
-        response = requests.get(website)
-        emails = find_emails(response.text)
-        
-        # Запись результатов в Google Sheets
-        write_job_urls_and_emails_to_sheet(sheet, row, job_urls, emails)
-        
-        # Обновление колонки Open Position
-        if job_urls:
-            update_open_positions(sheet, row, job_urls)
-        
-        # Добавляем задержку между запросами
-        time.sleep(1)
+    try:
+        if use_async:
+            logging.info(f"⚡ Параллельный режим: до {concurrency} сайтов одновременно, до {per_domain} на домен.")
+            asyncio.run(process_sites_async(sheet, websites, fetcher, concurrency, per_domain,
+                                            contact_pages=contact_pages))
+        else:
+            for row, website in enumerate(websites, start=2):  # Пропускаем заголовок
+                job_urls, emails, positions = collect_site_data(website, fetcher, contact_pages)
+                
+                # Запись результатов в Google Sheets
+                write_site_data(sheet, row, job_urls, emails, positions)
+                
+                # Добавляем задержку между запросами
+                time.sleep(1)
+    finally:
+        sheet.close()
     
+    logging.info(f"🌐 Загружено страниц: {fetcher.stats['fetched']}, повторно использовано: {fetcher.stats['cached']}")
+    logging.info(f"🌍 Переводы: из кэша {get_translator().stats['hits']}, через переводчик {get_translator().stats['misses']}")
+    logging.info(f"📤 Записано ячеек: {sheet.stats['cells']} за {sheet.stats['requests']} запросов, "
+                 f"без изменений пропущено: {sheet.stats['skipped']}")
+    storage_summary = get_storage().summary()
+    if storage_summary:
+        logging.info(storage_summary)
     logging.info("🎯 Парсинг завершен!")
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Поиск страниц с вакансиями и email-адресов на сайтах из Google Sheets")
+    parser.add_argument("--sheet", default="Parser", help="название таблицы")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="обрабатывать сайты параллельно")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="сколько сайтов обрабатывать одновременно")
+    parser.add_argument("--per-domain", type=int, default=PER_DOMAIN_LIMIT, help="сколько сайтов одного домена обрабатывать одновременно")
+    parser.add_argument("--contact-pages", type=int, default=0,
+                        help="сколько страниц контактов/импрессума обходить для поиска email (0 - только главная)")
+    parser.add_argument("--storage", choices=STORAGE_KINDS,
+                        help="где таблица: google или local (CSV для замеров без сети); по умолчанию - из SHEETS_STORAGE")
+    return parser.parse_args()
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    args = parse_args()
+    if args.storage:
+        set_storage(create_storage(args.storage))
+    main(args.sheet, args.use_async, args.concurrency, args.per_domain, args.contact_pages)
@@ -0,0 +1,106 @@
+import glob
+import json
+import os
+import time
+from typing import Dict, List, Iterator, Optional
+
+FLUSH_EVERY = 50  # Сбрасываем буфер на диск после стольких результатов
+FLUSH_INTERVAL = 5.0  # ...или если с прошлого сброса прошло столько секунд
+
+
+class JsonlResultWriter:
+    """Потоковая запись результатов: одна строка JSON на результат, сразу по готовности"""
+
+    def __init__(self, path: str, flush_every: int = FLUSH_EVERY, flush_interval: float = FLUSH_INTERVAL):
+        self.path = path
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.count = 0
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def write(self, result: Dict):
+        """Дописывает результат и при необходимости сбрасывает буфер"""
+        self._file.write(json.dumps(result, ensure_ascii=False) + '\n')
+        self.count += 1
+        self._pending += 1
+        if self._pending >= self.flush_every:
+            self.flush()
+        else:
+            self.flush_if_due()
+
+    def flush_if_due(self):
+        """Сбрасывает буфер, если в нем есть результаты старше flush_interval (вызывается и по таймеру)"""
+        if self._pending and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        self._file.flush()
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def read_jsonl(path: str) -> Iterator[Dict]:
+    """Читает результаты из JSONL (оборванная последняя строка после сбоя пропускается)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def load_results(path: str) -> List[Dict]:
+    """Загрузка результатов из JSON-массива или JSONL"""
+    if path.endswith('.jsonl'):
+        return list(read_jsonl(path))
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def site_key(url: str) -> str:
+    """Ключ сайта без протокола - совпадает для URL из таблицы и нормализованного URL результата"""
+    url = url.strip().lower()
+    for prefix in ('https://', 'http://'):
+        if url.startswith(prefix):
+            url = url[len(prefix):]
+            break
+    return url.rstrip('/')
+
+
+def find_latest_results(directory: str = '.') -> Optional[str]:
+    """Последний по времени изменения файл результатов JSONL"""
+    paths = glob.glob(os.path.join(directory, 'results_*.jsonl'))
+    return max(paths, key=os.path.getmtime) if paths else None
+
+
+def jsonl_to_json(jsonl_path: str, json_path: str) -> int:
+    """Конвертация JSONL в прежний формат (JSON-массив в порядке таблицы) для compare_results.py"""
+    # Один элемент на строку таблицы: после продолжения прерванного запуска строка может
+    # встречаться несколько раз - берем последнюю проверку (одинаковые URL в разных строках сохраняются)
+    latest = {}
+    for result in read_jsonl(jsonl_path):
+        latest[result.get('index', site_key(result['url']))] = result
+    results = list(latest.values())
+    # Результаты пишутся по мере готовности, порядок таблицы восстанавливаем по индексу
+    results.sort(key=lambda result: result.get('index', 0))
+    for result in results:
+        result.pop('index', None)
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    return len(results)
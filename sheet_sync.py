@@ -0,0 +1,205 @@
+import logging
+import random
+import threading
+import time
+from collections import namedtuple
+
+FLUSH_CELLS = 200  # Сбрасываем буфер, когда накопилось столько ячеек
+FLUSH_INTERVAL = 30.0  # ...или когда самой старой записи в буфере столько секунд
+MAX_RETRIES = 5  # Сколько раз повторяем запись после 429
+BACKOFF_BASE = 2.0  # Первая пауза (сек) после 429, дальше удваивается
+VALUE_INPUT_OPTION = "USER_ENTERED"  # Как update_cell: значения разбираются как при вводе руками
+
+# Ячейка из памяти (поля как у gspread.Cell)
+Cell = namedtuple("Cell", "row col value")
+
+def rowcol_to_a1(row, col):
+    """(1, 1) -> 'A1', (5, 28) -> 'AB5'"""
+    letters = ""
+    while col > 0:
+        col, remainder = divmod(col - 1, 26)
+        letters = chr(ord("A") + remainder) + letters
+    return f"{letters}{row}"
+
+def is_rate_limited(error):
+    """Ошибка Sheets API из-за превышения квоты (HTTP 429)"""
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None) == 429
+
+def merge_ranges(cells):
+    """
+    Склеивает ячейки {(row, col): value} в прямоугольные диапазоны:
+    соседние колонки строки - в отрезок, одинаковые отрезки соседних строк - в прямоугольник.
+    """
+    runs = []  # (row, first_col, [values])
+    for row, col in sorted(cells):
+        if runs and runs[-1][0] == row and runs[-1][1] + len(runs[-1][2]) == col:
+            runs[-1][2].append(cells[(row, col)])
+        else:
+            runs.append((row, col, [cells[(row, col)]]))
+
+    blocks = []  # [first_row, first_col, [[values]]]
+    open_blocks = {}  # (first_col, width) -> блок, который можно продолжить следующей строкой
+    for row, col, values in runs:
+        block = open_blocks.get((col, len(values)))
+        if block is not None and block[0] + len(block[2]) == row:
+            block[2].append(values)
+        else:
+            block = [row, col, [values]]
+            blocks.append(block)
+            open_blocks[(col, len(values))] = block
+
+    ranges = []
+    for row, col, values in blocks:
+        last = rowcol_to_a1(row + len(values) - 1, col + len(values[0]) - 1)
+        ranges.append({"range": f"{rowcol_to_a1(row, col)}:{last}", "values": values})
+    return ranges
+
+class SheetWriteBuffer:
+    """
+    Отложенная запись в лист: ячейки копятся в памяти и уходят одним batch_update
+    по порогу размера или времени. Неизмененные значения не записываются.
+    С auto_flush=False update_cell только ставит в очередь, а flush вызывает владелец
+    (например, из пула потоков, чтобы не блокировать цикл событий).
+    """
+
+    def __init__(self, sheet, current=None, flush_cells=FLUSH_CELLS, flush_interval=FLUSH_INTERVAL, auto_flush=True):
+        self.sheet = sheet
+        self.flush_cells = flush_cells
+        self.flush_interval = flush_interval
+        self.auto_flush = auto_flush
+        self._current = {}  # (row, col) -> значение, которое сейчас в таблице
+        self._inflight = {}  # (row, col) -> значение, которое записывается прямо сейчас
+        self._pending = {}  # (row, col) -> значение, ожидающее записи
+        self._oldest = None  # Когда в пустой буфер попала первая запись
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()  # Записи в таблицу идут по одной
+        self.stats = {"cells": 0, "skipped": 0, "requests": 0, "retries": 0}
+        if current is not None:
+            self.load(current)
+
+    def load(self, values):
+        """Текущее содержимое листа (как из get_all_values) - чтобы не переписывать то же самое"""
+        with self._lock:
+            for row, row_values in enumerate(values, start=1):
+                for col, value in enumerate(row_values, start=1):
+                    if value != "":
+                        self._current[(row, col)] = value
+
+    def _written(self, key):
+        """Значение в таблице (или уже отправленное в нее)"""
+        return self._inflight.get(key, self._current.get(key, ""))
+
+    def current(self, row, col):
+        """Значение ячейки с учетом еще не записанных изменений"""
+        with self._lock:
+            return self._pending.get((row, col), self._written((row, col)))
+
+    def update_cell(self, row, col, value):
+        """Ставит ячейку в очередь на запись (интерфейс как у gspread.Worksheet.update_cell)"""
+        key = (row, col)
+        with self._lock:
+            if str(self._written(key)) == str(value):
+                # В таблице уже это значение: отменяем и более раннюю незаписанную правку этой ячейки
+                self._pending.pop(key, None)
+                self.stats["skipped"] += 1
+                return
+            if key in self._pending and str(self._pending[key]) == str(value):
+                self.stats["skipped"] += 1
+                return
+            if not self._pending:
+                self._oldest = time.monotonic()
+            self._pending[key] = value
+            due = self._due()
+        if due and self.auto_flush:
+            self.flush()
+
+    def _due(self):
+        return bool(self._pending) and (len(self._pending) >= self.flush_cells
+                                        or time.monotonic() - self._oldest >= self.flush_interval)
+
+    def flush_due(self):
+        """Пора ли сбрасывать буфер (для auto_flush=False)"""
+        with self._lock:
+            return self._due()
+
+    def flush(self, raise_errors=False):
+        """
+        Записывает накопленное. Очередь не блокируется на время запроса: новые правки копятся дальше.
+        При ошибке ячейки возвращаются в буфер до следующей попытки (raise_errors - ошибка пробрасывается).
+        """
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return
+                batch, self._pending = self._pending, {}
+                self._inflight = batch
+                self._oldest = None
+            ranges = merge_ranges(batch)
+            try:
+                self._batch_update(ranges)
+            except Exception as e:
+                with self._lock:
+                    # Правки, сделанные во время запроса, новее неудавшихся
+                    self._pending = {**batch, **self._pending}
+                    self._oldest = time.monotonic()
+                    self._inflight = {}
+                logging.error(f"❌ Ошибка записи в Google Sheets ({len(batch)} ячеек): {e}")
+                if raise_errors:
+                    raise
+                return
+            with self._lock:
+                self._current.update(batch)
+                self._inflight = {}
+                self.stats["cells"] += len(batch)
+            logging.info(f"✅ Записано {len(batch)} ячеек одним запросом ({len(ranges)} диапазонов)")
+
+    def _batch_update(self, ranges):
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                self.sheet.batch_update(ranges, value_input_option=VALUE_INPUT_OPTION)
+                self.stats["requests"] += 1
+                return
+            except Exception as e:
+                if not is_rate_limited(e) or attempt == MAX_RETRIES:
+                    raise
+                delay = BACKOFF_BASE * 2 ** attempt * random.uniform(1, 1.5)
+                self.stats["retries"] += 1
+                logging.warning(f"⏳ Превышена квота Google Sheets, повтор через {delay:.1f} с")
+                time.sleep(delay)
+
+    def close(self):
+        """Последний сброс: если он не удался, ошибка пробрасывается - данные не теряются молча"""
+        self.flush(raise_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+class SheetSync(SheetWriteBuffer):
+    """
+    Лист в памяти: читается целиком один раз при открытии, дальше чтения идут из индекса
+    (с учетом еще не записанных правок), а записи - пакетами через SheetWriteBuffer.
+    Методы чтения совпадают с gspread.Worksheet, поэтому его можно передавать вместо листа.
+    """
+
+    @classmethod
+    def open(cls, sheet, **kwargs):
+        values = sheet.get_all_values()
+        logging.info(f"📥 Лист прочитан одним запросом: {len(values)} строк")
+        return cls(sheet, current=values, **kwargs)
+
+    def cell(self, row, col):
+        return Cell(row, col, self.current(row, col))
+
+    def row_values(self, row):
+        with self._lock:
+            cols = [col for r, col in list(self._current) + list(self._inflight) + list(self._pending) if r == row]
+            return [self.current(row, col) for col in range(1, max(cols, default=0) + 1)]
+
+    def col_values(self, col):
+        with self._lock:
+            rows = [row for row, c in list(self._current) + list(self._inflight) + list(self._pending) if c == col]
+            return [self.current(row, col) for row in range(1, max(rows, default=0) + 1)]
@@ -0,0 +1,118 @@
+import html as html_lib
+import logging
+import re
+import threading
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+from langdetect import detect, DetectorFactory
+
+# Одинаковый результат определения языка от запуска к запуску
+DetectorFactory.seed = 0
+
+HEAD_SCAN_CHARS = 32768  # Разметку (lang, meta) ищем только в начале документа
+BODY_SCAN_CHARS = 200000  # Сколько HTML просматриваем, собирая видимый текст
+TEXT_SAMPLE_CHARS = 2000  # Сколько видимого текста отдаем langdetect
+MIN_SAMPLE_CHARS = 20  # На более коротком тексте langdetect гадает
+DOMAIN_CACHE_SIZE = 4096  # Сколько доменов помним
+
+HTML_LANG_RE = re.compile(r"<html\b[^>]*?\blang\s*=\s*[\"']?([a-zA-Z_-]+)", re.IGNORECASE)
+META_TAG_RE = re.compile(r"<meta\b[^>]*>", re.IGNORECASE)
+META_ATTR_RE = re.compile(r"([a-zA-Z:-]+)\s*=\s*(?:\"([^\"]*)\"|'([^']*)'|([^\s>]+))")
+LANGUAGE_CODE_RE = re.compile(r"^[a-z]{2,3}$")
+# Невидимые части страницы и теги
+HIDDEN_RE = re.compile(
+    r"<(script|style|noscript|template|svg)\b[^>]*>.*?</\1\s*>|<!--.*?-->",
+    re.IGNORECASE | re.DOTALL
+)
+BODY_RE = re.compile(r"<body\b", re.IGNORECASE)
+TAG_RE = re.compile(r"<[^>]+>")
+SPACE_RE = re.compile(r"\s+")
+
+# Глобальный определитель языка (общий для parser.py и company.py)
+_detector = None
+
+def normalize_language(value):
+    """'en-US', 'de_DE', 'EN' -> 'en'; первый язык из списка 'de, en'; None, если это не код языка"""
+    if not value:
+        return None
+    code = value.split(",")[0].strip().replace("_", "-").split("-")[0].lower()
+    return code if LANGUAGE_CODE_RE.match(code) else None
+
+def meta_language(head):
+    """Язык из og:locale или <meta http-equiv="Content-Language">"""
+    for tag in META_TAG_RE.findall(head):
+        attrs = {name.lower(): double or single or bare for name, double, single, bare in META_ATTR_RE.findall(tag)}
+        key = (attrs.get("property") or attrs.get("name") or attrs.get("http-equiv") or "").lower()
+        if key in ("og:locale", "content-language"):
+            language = normalize_language(attrs.get("content"))
+            if language:
+                return language
+    return None
+
+def markup_language(html, headers=None):
+    """Язык, объявленный самой страницей: <html lang>, заголовок Content-Language, og:locale"""
+    head = html[:HEAD_SCAN_CHARS]
+    match = HTML_LANG_RE.search(head)
+    language = normalize_language(match.group(1)) if match else None
+    if language is None and headers is not None:
+        language = normalize_language(headers.get("Content-Language"))
+    return language or meta_language(head)
+
+def visible_text_sample(html, limit=TEXT_SAMPLE_CHARS):
+    """Начало видимого текста страницы (без скриптов, стилей и разметки)"""
+    # Ищем только в просматриваемом окне, не копируя всю страницу
+    match = BODY_RE.search(html, 0, BODY_SCAN_CHARS)
+    chunk = html[match.start() if match else 0:BODY_SCAN_CHARS]
+    text = TAG_RE.sub(" ", HIDDEN_RE.sub(" ", chunk))
+    return SPACE_RE.sub(" ", html_lib.unescape(text)).strip()[:limit]
+
+def detect_text_language(text, default="unknown"):
+    """Определение языка обычного текста через langdetect"""
+    if not text or len(text) < MIN_SAMPLE_CHARS:
+        return default
+    try:
+        return normalize_language(detect(text)) or default
+    except Exception:
+        return default
+
+class LanguageDetector:
+    """
+    Определение языка страницы: сначала разметка и заголовки (дешево, для каждой страницы),
+    потом langdetect по образцу видимого текста - его результат кэшируется по домену.
+    """
+
+    def __init__(self, cache_size=DOMAIN_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._cache = OrderedDict()  # домен -> язык по тексту
+        self._lock = threading.Lock()
+        self.stats = {"markup": 0, "cached": 0, "detected": 0}
+
+    def detect(self, url, html, headers=None, default="unknown"):
+        language = markup_language(html, headers)
+        if language:
+            self.stats["markup"] += 1
+            return language
+
+        domain = urlparse(url).netloc.lower()
+        with self._lock:
+            if domain in self._cache:
+                self._cache.move_to_end(domain)
+                self.stats["cached"] += 1
+                return self._cache[domain] or default
+
+        language = detect_text_language(visible_text_sample(html), default=None)
+        if language is None:
+            logging.warning(f"⚠️ Не удалось определить язык страницы {url}")
+        with self._lock:
+            self.stats["detected"] += 1
+            self._cache[domain] = language
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return language or default
+
+def get_language_detector():
+    global _detector
+    if _detector is None:
+        _detector = LanguageDetector()
+    return _detector
@@ -0,0 +1,251 @@
+import csv
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter, deque
+from types import SimpleNamespace
+
+from sheet_sync import Cell
+
+STORAGE_ENV = "SHEETS_STORAGE"  # google (по умолчанию) или local
+STORAGE_KINDS = ["google", "local"]
+LOCAL_DIR_ENV = "SHEETS_LOCAL_DIR"
+LOCAL_LATENCY_ENV = "SHEETS_LOCAL_LATENCY"
+LOCAL_QUOTA_ENV = "SHEETS_LOCAL_QUOTA"
+
+CREDENTIALS_PATH = "credentials.json"
+GOOGLE_SCOPES = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+LOCAL_DIR = "local_sheets"  # Локальные таблицы: <папка>/<таблица>/<лист>.csv
+LOCAL_LATENCY = 0.0  # Имитация задержки одного запроса к API (сек)
+LOCAL_QUOTA = 0  # Имитация квоты: запросов в минуту (0 - без ограничения)
+DEFAULT_WORKSHEET = "Sheet1"
+
+A1_RE = re.compile(r"^([A-Z]*)(\d*)$")
+
+# Глобальное хранилище таблиц (выбирается через SHEETS_STORAGE или set_storage)
+_storage = None
+
+def a1_to_rowcol(label):
+    """'AB5' -> (5, 28); у 'A' строка None, у '5' колонка None"""
+    match = A1_RE.match(label.upper())
+    if match is None:
+        raise ValueError(f"Неверный адрес ячейки: {label}")
+    letters, digits = match.groups()
+    col = 0
+    for letter in letters:
+        col = col * 26 + ord(letter) - ord("A") + 1
+    return (int(digits) if digits else None), (col or None)
+
+class QuotaExceededError(Exception):
+    """Имитация ответа 429 от Sheets API (поле response.status_code - как у gspread.APIError)"""
+
+    def __init__(self, message):
+        super().__init__(message)
+        self.response = SimpleNamespace(status_code=429)
+
+class GoogleStorage:
+    """Google Sheets через gspread: листы - настоящие gspread.Worksheet"""
+
+    def __init__(self, credentials_path=CREDENTIALS_PATH, scopes=None):
+        self.credentials_path = credentials_path
+        self.scopes = scopes or GOOGLE_SCOPES
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            # Библиотеки Google нужны только этому хранилищу - локальное работает без них
+            import gspread
+            from google.oauth2.service_account import Credentials
+            try:
+                creds = Credentials.from_service_account_file(self.credentials_path, scopes=self.scopes)
+                self._client = gspread.authorize(creds)
+                logging.info("✅ Успешная авторизация в Google Sheets.")
+            except Exception as e:
+                logging.error(f"❌ Ошибка авторизации: {e}")
+                raise
+        return self._client
+
+    def open_worksheet(self, spreadsheet, worksheet=None, by_key=False):
+        """Лист таблицы (по названию или ключу); без worksheet - первый лист"""
+        document = self.client.open_by_key(spreadsheet) if by_key else self.client.open(spreadsheet)
+        return document.worksheet(worksheet) if worksheet else document.sheet1
+
+    def summary(self):
+        """Для настоящих таблиц вызовы не считаются"""
+        return None
+
+class LocalWorksheet:
+    """
+    Лист в CSV-файле с методами gspread.Worksheet, которые использует проект.
+    Каждый вызов считается как запрос к API: учитывается, задерживается и проверяется по квоте.
+    """
+
+    def __init__(self, storage, path, title):
+        self.storage = storage
+        self.path = path
+        self.title = title
+        self._lock = threading.Lock()
+        self._rows = []
+        if os.path.exists(path):
+            with open(path, newline="", encoding="utf-8") as f:
+                self._rows = [row for row in csv.reader(f)]
+
+    def _value(self, row, col):
+        if row <= len(self._rows) and col <= len(self._rows[row - 1]):
+            return self._rows[row - 1][col - 1]
+        return ""
+
+    def _set(self, row, col, value):
+        while len(self._rows) < row:
+            self._rows.append([])
+        cells = self._rows[row - 1]
+        while len(cells) < col:
+            cells.append("")
+        cells[col - 1] = "" if value is None else str(value)
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerows(self._rows)
+        os.replace(temp_path, self.path)
+
+    def get_all_values(self):
+        self.storage.request("get_all_values")
+        with self._lock:
+            width = max((len(row) for row in self._rows), default=0)
+            return [row + [""] * (width - len(row)) for row in self._rows]
+
+    def get_values(self, range_name):
+        """Значения диапазона 'A2:C' / 'A1:B10' (как у gspread, без пустых хвостов строк)"""
+        self.storage.request("get_values")
+        start, _, end = range_name.split("!")[-1].partition(":")
+        first_row, first_col = a1_to_rowcol(start)
+        last_row, last_col = a1_to_rowcol(end) if end else (first_row, first_col)
+        with self._lock:
+            values = []
+            for row in range(first_row or 1, (last_row or len(self._rows)) + 1):
+                width = last_col or max(len(self._rows[row - 1]) if row <= len(self._rows) else 0, 1)
+                cells = [self._value(row, col) for col in range(first_col or 1, width + 1)]
+                while cells and cells[-1] == "":
+                    cells.pop()
+                values.append(cells)
+            while values and not values[-1]:
+                values.pop()
+            return values
+
+    def col_values(self, col):
+        self.storage.request("col_values")
+        with self._lock:
+            values = [self._value(row, col) for row in range(1, len(self._rows) + 1)]
+        while values and values[-1] == "":
+            values.pop()
+        return values
+
+    def row_values(self, row):
+        self.storage.request("row_values")
+        with self._lock:
+            values = list(self._rows[row - 1]) if row <= len(self._rows) else []
+        while values and values[-1] == "":
+            values.pop()
+        return values
+
+    def cell(self, row, col):
+        self.storage.request("cell")
+        with self._lock:
+            return Cell(row, col, self._value(row, col))
+
+    def update_cell(self, row, col, value):
+        self.storage.request("update_cell")
+        with self._lock:
+            self._set(row, col, value)
+            self._save()
+
+    def batch_update(self, data, **kwargs):
+        """[{"range": "B2:D3", "values": [[...], [...]]}] - одним запросом"""
+        self.storage.request("batch_update")
+        with self._lock:
+            for update in data:
+                first_row, first_col = a1_to_rowcol(update["range"].split("!")[-1].split(":")[0])
+                for i, values in enumerate(update["values"]):
+                    for j, value in enumerate(values):
+                        self._set(first_row + i, first_col + j, value)
+            self._save()
+
+class LocalStorage:
+    """
+    Локальная замена Google Sheets: листы в CSV, счетчики вызовов API,
+    имитация задержки запросов и квоты (429 при превышении) - для замеров без сети.
+    """
+
+    def __init__(self, directory=LOCAL_DIR, latency=LOCAL_LATENCY, quota_per_minute=LOCAL_QUOTA):
+        self.directory = directory
+        self.latency = latency
+        self.quota_per_minute = quota_per_minute
+        self.stats = Counter()
+        self._requests = deque()  # Время последних запросов - для квоты
+        self._lock = threading.Lock()
+        self._worksheets = {}
+
+    def open_worksheet(self, spreadsheet, worksheet=None, by_key=False):
+        folder = os.path.join(self.directory, spreadsheet)
+        if worksheet is None:
+            # Первый лист - первый по имени CSV в папке таблицы
+            existing = sorted(name for name in os.listdir(folder) if name.endswith(".csv")) if os.path.isdir(folder) else []
+            worksheet = existing[0][:-len(".csv")] if existing else DEFAULT_WORKSHEET
+        path = os.path.join(folder, f"{worksheet}.csv")
+        with self._lock:
+            if path not in self._worksheets:
+                self._worksheets[path] = LocalWorksheet(self, path, worksheet)
+            return self._worksheets[path]
+
+    def request(self, method):
+        """Учитывает вызов API: квота, счетчики и задержка"""
+        with self._lock:
+            now = time.monotonic()
+            while self._requests and now - self._requests[0] >= 60:
+                self._requests.popleft()
+            if self.quota_per_minute and len(self._requests) >= self.quota_per_minute:
+                self.stats["rejected"] += 1
+                raise QuotaExceededError(f"Quota exceeded: {self.quota_per_minute} requests per minute")
+            self._requests.append(now)
+            self.stats[method] += 1
+            self.stats["requests"] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def summary(self):
+        """Сколько было вызовов API по методам"""
+        details = ", ".join(f"{method}: {count}" for method, count in sorted(self.stats.items()) if method != "requests")
+        return f"📊 Локальные таблицы: {self.stats['requests']} запросов к API ({details or 'нет'})"
+
+def create_storage(kind=None, scopes=None):
+    """
+    Хранилище google или local (по умолчанию - из SHEETS_STORAGE);
+    scopes - права доступа для Google (например, только чтение), по умолчанию GOOGLE_SCOPES;
+    параметры локального - из SHEETS_LOCAL_DIR, SHEETS_LOCAL_LATENCY, SHEETS_LOCAL_QUOTA.
+    """
+    kind = (kind or os.environ.get(STORAGE_ENV, "google")).lower()
+    if kind == "local":
+        return LocalStorage(
+            os.environ.get(LOCAL_DIR_ENV, LOCAL_DIR),
+            float(os.environ.get(LOCAL_LATENCY_ENV, LOCAL_LATENCY)),
+            int(os.environ.get(LOCAL_QUOTA_ENV, LOCAL_QUOTA))
+        )
+    if kind not in STORAGE_KINDS:
+        raise ValueError(f"Неизвестное хранилище {kind}: ожидается {' или '.join(STORAGE_KINDS)}")
+    return GoogleStorage(scopes=scopes)
+
+def get_storage():
+    global _storage
+    if _storage is None:
+        _storage = create_storage()
+    return _storage
+
+def set_storage(storage):
+    """Подмена хранилища (например, LocalStorage(latency=0.5) для замеров)"""
+    global _storage
+    _storage = storage
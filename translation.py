@@ -0,0 +1,246 @@
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from deep_translator import GoogleTranslator
+
+TRANSLATION_CACHE_PATH = "translations.sqlite3"  # Постоянный кэш переводов на диске
+MEMORY_CACHE_SIZE = 4096  # Сколько переводов держим в памяти (LRU)
+BATCH_WINDOW = 0.05  # Сколько секунд собираем запросы перед отправкой пакета
+BATCH_SIZE = 50  # Максимум текстов в одном пакетном запросе
+BATCH_SEPARATOR = "\n"  # Разделитель текстов в пакетном запросе
+
+# Глобальный переводчик (подменяется через set_translator, например заглушкой в тестах)
+_translator = None
+
+class GoogleTranslatorBackend:
+    """Перевод через Google Translate (deep-translator)"""
+
+    def translate(self, text, source, target):
+        return GoogleTranslator(source=source, target=target).translate(text)
+
+    def translate_batch(self, texts, source, target):
+        """Один запрос на весь пакет: тексты склеиваются через перевод строки"""
+        translated = GoogleTranslator(source=source, target=target).translate(BATCH_SEPARATOR.join(texts))
+        parts = translated.split(BATCH_SEPARATOR) if translated else []
+        if len(parts) != len(texts):
+            # Переводчик объединил или разбил строки - переводим по одной
+            logging.warning(f"⚠️ Пакетный перевод на {target} вернул {len(parts)} строк вместо {len(texts)}, переводим по одной")
+            return [self.translate(text, source, target) for text in texts]
+        return [part.strip() for part in parts]
+
+class StubTranslator:
+    """Локальная заглушка вместо сетевого переводчика: перевод по словарю, иначе текст без изменений"""
+
+    def __init__(self, table=None):
+        self.table = table or {}  # (source, target, text) -> перевод
+        self.calls = 0
+
+    def translate(self, text, source, target):
+        self.calls += 1
+        return self.table.get((source, target, text), text)
+
+    def translate_batch(self, texts, source, target):
+        self.calls += 1
+        return [self.table.get((source, target, text), text) for text in texts]
+
+class BatchingTranslator:
+    """
+    Собирает запросы на перевод от всех потоков, группирует по паре языков
+    и отправляет пакетами; ответы возвращаются ожидающим через Future.
+    """
+
+    def __init__(self, backend, window=BATCH_WINDOW, max_batch=BATCH_SIZE):
+        self.backend = backend
+        self.window = window
+        self.max_batch = max_batch
+        self._pending = {}  # (source, target) -> {text: Future}
+        self._condition = threading.Condition()
+        self._worker = None
+        self.stats = {"batches": 0, "texts": 0}
+
+    def submit(self, text, source, target):
+        """Ставит текст в очередь; одинаковые тексты в очереди делят один Future"""
+        with self._condition:
+            group = self._pending.setdefault((source, target), {})
+            future = group.get(text)
+            if future is None:
+                future = group[text] = Future()
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, daemon=True)
+                self._worker.start()
+            self._condition.notify()
+            return future
+
+    def translate_many(self, texts, source, target):
+        futures = [self.submit(text, source, target) for text in texts]
+        return [future.result() for future in futures]
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+                # Даем другим потокам добавить свои запросы, пока пакет не заполнится
+                self._condition.wait_for(
+                    lambda: any(len(group) >= self.max_batch for group in self._pending.values()),
+                    timeout=self.window
+                )
+                pending, self._pending = self._pending, {}
+            for (source, target), group in pending.items():
+                items = list(group.items())
+                for start in range(0, len(items), self.max_batch):
+                    self._send(source, target, items[start:start + self.max_batch])
+
+    def _send(self, source, target, items):
+        """Отправляет пакет; любая ошибка достается всем ожидающим, чтобы никто не завис на Future"""
+        texts = [text for text, _ in items]
+        try:
+            if hasattr(self.backend, "translate_batch"):
+                translations = self.backend.translate_batch(texts, source, target)
+            else:
+                translations = [self.backend.translate(text, source, target) for text in texts]
+            if len(translations) != len(items):
+                raise ValueError(f"Переводчик вернул {len(translations)} переводов вместо {len(items)}")
+            self.stats["batches"] += 1
+            self.stats["texts"] += len(texts)
+            for (_, future), translation in zip(items, translations):
+                future.set_result(translation)
+        except Exception as e:
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+
+class TranslationCache:
+    """Кэш переводов: SQLite на диске + LRU в памяти; ключ - (source, target, text)"""
+
+    def __init__(self, path=TRANSLATION_CACHE_PATH, memory_size=MEMORY_CACHE_SIZE):
+        self.memory_size = memory_size
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            "source TEXT NOT NULL, target TEXT NOT NULL, text TEXT NOT NULL, translation TEXT NOT NULL, "
+            "PRIMARY KEY (source, target, text))"
+        )
+        self._db.commit()
+
+    def _remember(self, key, translation):
+        self._memory[key] = translation
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def get(self, source, target, text):
+        key = (source, target, text)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+            row = self._db.execute(
+                "SELECT translation FROM translations WHERE source = ? AND target = ? AND text = ?", key
+            ).fetchone()
+            if row is None:
+                return None
+            self._remember(key, row[0])
+            return row[0]
+
+    def put(self, source, target, text, translation):
+        key = (source, target, text)
+        with self._lock:
+            self._remember(key, translation)
+            self._db.execute("INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?)", (*key, translation))
+            self._db.commit()
+
+    def known_languages(self, source):
+        """Языки, на которые уже что-то переводилось с source"""
+        with self._lock:
+            rows = self._db.execute("SELECT DISTINCT target FROM translations WHERE source = ?", (source,))
+            return [row[0] for row in rows]
+
+    def load(self, source, target, texts):
+        """Подгружает переводы из SQLite в память одним запросом"""
+        texts = list(texts)
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT text, translation FROM translations WHERE source = ? AND target = ? "
+                f"AND text IN ({', '.join('?' * len(texts))})",
+                (source, target, *texts)
+            ).fetchall()
+            for text, translation in rows:
+                self._remember((source, target, text), translation)
+        return {text for text, _ in rows}
+
+class CachedTranslator:
+    """Переводчик с кэшем: к сетевому переводчику обращается только при промахе"""
+
+    def __init__(self, backend=None, cache=None, batching=True):
+        self.backend = backend or GoogleTranslatorBackend()
+        self.cache = cache or TranslationCache()
+        # Промахи кэша от всех потоков уходят пакетами, сгруппированными по языку
+        self.batcher = BatchingTranslator(self.backend) if batching else None
+        self.stats = {"hits": 0, "misses": 0}
+
+    def translate(self, text, source, target):
+        return self.translate_many([text], source, target)[0]
+
+    def translate_many(self, texts, source, target):
+        results = list(texts)
+        if source == target:
+            return results
+        missing = []
+        for i, text in enumerate(texts):
+            if not text:
+                continue
+            translation = self.cache.get(source, target, text)
+            if translation is not None:
+                self.stats["hits"] += 1
+                results[i] = translation
+            else:
+                missing.append(i)
+        if not missing:
+            return results
+
+        self.stats["misses"] += len(missing)
+        missing_texts = [texts[i] for i in missing]
+        if self.batcher is not None:
+            translations = self.batcher.translate_many(missing_texts, source, target)
+        else:
+            translations = [self.backend.translate(text, source, target) for text in missing_texts]
+        for i, translation in zip(missing, translations):
+            results[i] = translation
+            if translation:
+                self.cache.put(source, target, texts[i], translation)
+        return results
+
+    def prewarm(self, keywords, source="en", languages=None):
+        """
+        Прогревает таблицу ключевые слова x языки: по умолчанию для всех языков, которые уже встречались.
+        Уже сохраненные переводы только загружаются в память, недостающие - переводятся.
+        """
+        if languages is None:
+            languages = self.cache.known_languages(source)
+        for language in languages:
+            found = self.cache.load(source, language, keywords)
+            missing = [keyword for keyword in keywords if keyword not in found]
+            if missing:
+                try:
+                    self.translate_many(missing, source, language)
+                except Exception as e:
+                    logging.warning(f"⚠️ Не удалось прогреть переводы на {language}: {e}")
+        if languages:
+            logging.info(f"🌍 Кэш переводов прогрет для языков: {', '.join(languages)}")
+
+def get_translator():
+    global _translator
+    if _translator is None:
+        _translator = CachedTranslator()
+    return _translator
+
+def set_translator(translator):
+    """Подмена переводчика (например, CachedTranslator(StubTranslator(), TranslationCache(':memory:')))"""
+    global _translator
+    _translator = translator
@@ -1,59 +1,172 @@
-import gspread
-from google.oauth2.service_account import Credentials
-from googlesearch import search
+import argparse
 import logging
+import re
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from sheet_sync import SheetSync
+from storage import STORAGE_KINDS, create_storage, get_storage, set_storage
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
-# Авторизация в Google Sheets
-def authenticate_google_sheets():
-    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-    try:
-        creds = Credentials.from_service_account_file("credentials.json", scopes=scope)
-        client = gspread.authorize(creds)
-        logging.info("✅ Успешная авторизация в Google Sheets.")
-        return client
-    except Exception as e:
-        logging.error(f"❌ Ошибка авторизации: {e}")
-        raise
-
-client = authenticate_google_sheets()
-
-# Открываем таблицу и лист
+# Таблица и лист
 SHEET_NAME = "Parser"
 WORKSHEET_NAME = "WebsiteFinder"
+COMPANY_COL = 1  # Колонка A - название компании
+WEBSITE_COL = 2  # Колонка B - найденный сайт
+
+NOT_FOUND = "Не найдено"
+QUERY_TEMPLATE = "{company} официальный сайт"
+
+# Параметры поиска
+SEARCH_RATE = 0.5  # Запросов к поисковику в секунду (как прежняя пауза в 2 с между запросами)
+SEARCH_BURST = 1  # Сколько запросов можно отправить подряд без паузы
+SEARCH_WORKERS = 4  # Сколько запросов может ждать ответа одновременно
+
+class TokenBucket:
+    """Ограничитель частоты: не больше rate запросов в секунду, до burst подряд (общий для всех потоков)"""
+
+    def __init__(self, rate, burst=1):
+        if not rate > 0 or burst < 1:
+            raise ValueError(f"Нужны rate > 0 и burst >= 1, получено rate={rate}, burst={burst}")
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Ждет, пока появится свободный токен, и забирает его"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+class GoogleSearchProvider:
+    """Поиск через Google (googlesearch-python): первый результат выдачи"""
+
+    def __init__(self, lang="ru"):
+        self.lang = lang
+
+    def search(self, query):
+        from googlesearch import search  # Нужен только этому поисковику
+        results = list(search(query, num_results=1, lang=self.lang))
+        return results[0] if results else None
+
+class StubSearchProvider:
+    """Локальная заглушка вместо поисковика: сайт по словарю, иначе https://<название>.example"""
 
-try:
-    sheet = client.open(SHEET_NAME).worksheet(WORKSHEET_NAME)
-    logging.info(f"📄 Открыта таблица: {SHEET_NAME} / {WORKSHEET_NAME}")
-except Exception as e:
-    logging.error(f"❌ Ошибка открытия таблицы: {e}")
-    raise
+    def __init__(self, table=None, latency=0.0):
+        self.table = table or {}  # запрос -> сайт (None - не найдено)
+        self.latency = latency  # Имитация времени ответа поисковика
+        self.calls = 0
 
-# Получаем список компаний из первого столбца (A)
-companies = sheet.col_values(1)[1:]  # Пропускаем заголовок
+    def search(self, query):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if query in self.table:
+            return self.table[query]
+        slug = re.sub(r"[^a-z0-9]+", "-", query.lower().replace(" официальный сайт", "")).strip("-")
+        return f"https://{slug}.example" if slug else None
 
-def find_website(company_name):
-    """Ищет сайт компании в Google"""
-    query = f"{company_name} официальный сайт"
+SEARCH_PROVIDERS = {
+    "google": GoogleSearchProvider,
+    "stub": StubSearchProvider
+}
+
+def find_website(company_name, provider=None):
+    """Ищет сайт компании"""
+    query = QUERY_TEMPLATE.format(company=company_name)
     try:
-        results = list(search(query, num_results=1, lang="ru"))  # Исправленный вызов
-        return results[0] if results else "Не найдено"
+        return (provider or GoogleSearchProvider()).search(query) or NOT_FOUND
     except Exception as e:
         logging.error(f"❌ Ошибка при поиске {company_name}: {e}")
-        return "Не найдено"
-
-# Обновляем Google Sheets
-for i, company in enumerate(companies, start=2):  # Начинаем со 2-й строки (1 - заголовок)
-    if not company.strip():
-        continue  # Пропускаем пустые строки
-    
-    website = find_website(company)
-    sheet.update_cell(i, 2, website)  # Записываем в колонку B (Website)
-    logging.info(f"🔍 {company} → {website}")
-    
-    time.sleep(2)  # Задержка для избежания блокировки Google
-
-logging.info("✅ Готово! Данные обновлены в Google Sheets.")
+        return NOT_FOUND
+
+def resolve_websites(companies, provider, workers=SEARCH_WORKERS, rate=SEARCH_RATE, burst=SEARCH_BURST):
+    """
+    Параллельный поиск сайтов для {название: [строки]}: частоту ограничивает общий TokenBucket,
+    а не пауза после каждой строки. Возвращает (название, сайт, строки) по мере готовности.
+    """
+    bucket = TokenBucket(rate, burst)
+
+    def resolve(company):
+        bucket.acquire()
+        return find_website(company, provider)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(resolve, company): company for company in companies}
+        for future in as_completed(futures):
+            company = futures[future]
+            yield company, future.result(), companies[company]
+
+def main(sheet_name=SHEET_NAME, worksheet_name=WORKSHEET_NAME, provider=None, workers=SEARCH_WORKERS,
+         rate=SEARCH_RATE, only_missing=False):
+    provider = provider or GoogleSearchProvider()
+    try:
+        # Лист читается один раз, найденные сайты записываются пакетами
+        sheet = SheetSync.open(get_storage().open_worksheet(sheet_name, worksheet_name))
+        logging.info(f"📄 Открыта таблица: {sheet_name} / {worksheet_name}")
+    except Exception as e:
+        logging.error(f"❌ Ошибка открытия таблицы: {e}")
+        raise
+
+    # Компании из первого столбца (A); одинаковые названия ищем один раз
+    companies = {}
+    for row, company in enumerate(sheet.col_values(COMPANY_COL)[1:], start=2):  # 1 - заголовок
+        company = company.strip()
+        if not company:
+            continue  # Пропускаем пустые строки
+        if only_missing and sheet.cell(row, WEBSITE_COL).value not in ("", NOT_FOUND):
+            continue
+        companies.setdefault(company, []).append(row)
+    logging.info(f"🔎 Ищем сайты для {len(companies)} компаний: {workers} потоков, до {rate} запросов/с")
+
+    started = time.monotonic()
+    try:
+        for company, website, rows in resolve_websites(companies, provider, workers, rate):
+            for row in rows:
+                sheet.update_cell(row, WEBSITE_COL, website)  # Записываем в колонку B (Website)
+            logging.info(f"🔍 {company} → {website}")
+    finally:
+        sheet.close()
+
+    elapsed = time.monotonic() - started
+    logging.info(f"⏱️ {len(companies)} компаний за {elapsed:.1f} с; записано ячеек: {sheet.stats['cells']} "
+                 f"за {sheet.stats['requests']} запросов")
+    storage_summary = get_storage().summary()
+    if storage_summary:
+        logging.info(storage_summary)
+    logging.info("✅ Готово! Данные обновлены в Google Sheets.")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Поиск сайтов компаний из Google Sheets")
+    parser.add_argument("--sheet", default=SHEET_NAME, help="название таблицы")
+    parser.add_argument("--worksheet", default=WORKSHEET_NAME, help="название листа")
+    parser.add_argument("--provider", choices=list(SEARCH_PROVIDERS), default="google",
+                        help="поисковик (stub - локальная заглушка для проверок без сети)")
+    parser.add_argument("--workers", type=int, default=SEARCH_WORKERS, help="сколько запросов ждут ответа одновременно")
+    parser.add_argument("--rate", type=float, default=SEARCH_RATE, help="запросов к поисковику в секунду")
+    parser.add_argument("--only-missing", action="store_true", help="искать только для строк без найденного сайта")
+    parser.add_argument("--storage", choices=STORAGE_KINDS,
+                        help="где таблица: google или local (CSV); по умолчанию - из SHEETS_STORAGE")
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers должно быть не меньше 1")
+    if not args.rate > 0:  # Ноль, отрицательное и nan
+        parser.error("--rate должно быть больше 0")
+    return args
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.storage:
+        set_storage(create_storage(args.storage))
+    main(args.sheet, args.worksheet, SEARCH_PROVIDERS[args.provider](), args.workers, args.rate, args.only_missing)